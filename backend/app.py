@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
 import pymongo
@@ -7,14 +7,27 @@ import jwt
 from datetime import datetime, timedelta
 import uuid
 from pathlib import Path
-import json
+import hashlib
+from functools import wraps
+
+from bulk_export import MIMETYPES, export_complaints, parse_columns
+from bulk_import import decode_lines, detect_format, import_complaints
+from storage.counters import ComplaintCounters
+from storage.query import complaint_matches, parse_query_args, project, select_complaints
+from storage.serialization import JSONProvider, dumps
+from utils.complaint_utils import complaint_committer, complaint_log
+from utils.compression import init_compression, negotiated_encoding
 
 app = Flask(__name__)
+app.json = JSONProvider(app)
 CORS(app)
+# gzip for clients that accept it; compressed bodies are cached by ETag
+init_compression(app)
 
 # MongoDB Configuration
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
-client = pymongo.MongoClient(MONGODB_URI)
+# connect=False: no monitor threads before gunicorn forks (preload_app)
+client = pymongo.MongoClient(MONGODB_URI, connect=False)
 db = client.complaintsdb  # Database name
 users_collection = db.users
 
@@ -31,8 +44,7 @@ DATA_DIR.mkdir(exist_ok=True)
 
 # Initialize complaints file if it doesn't exist
 if not COMPLAINTS_FILE.exists():
-    with open(COMPLAINTS_FILE, 'w') as f:
-        json.dump([], f, indent=2)
+    COMPLAINTS_FILE.write_bytes(b'[]')
 
 @app.route('/api/health')
 def health_check():
@@ -87,13 +99,6 @@ def create_complaint():
     if not data or not data.get('title') or not data.get('description') or not data.get('contactInfo'):
         return jsonify({'error': 'Title, description, and contactInfo are required'}), 400
 
-    complaints = []
-    try:
-        with open(COMPLAINTS_FILE, 'r') as f:
-            complaints = json.load(f)
-    except FileNotFoundError:
-        pass  # Handle case where file doesn't exist yet
-
     new_complaint = {
         'id': str(uuid.uuid4()),
         'title': data['title'],
@@ -108,49 +113,227 @@ def create_complaint():
         'createdAt': datetime.utcnow().isoformat()
     }
 
-    complaints.append(new_complaint)
-
-    with open(COMPLAINTS_FILE, 'w') as f:
-        json.dump(complaints, f, indent=2)
+    # Batched with concurrent submissions; returns once durable per COMPLAINT_DURABILITY
+    complaint_committer.submit(new_complaint)
 
     return jsonify({'message': 'Complaint submitted successfully', 'id': new_complaint['id']}), 201
 
+def conditional(view):
+    """Add ETag/Last-Modified to a GET view and answer revalidations with 304.
+
+    The tag comes from the store's version stamp plus the request URL, so an
+    unchanged store is confirmed without loading or serializing complaints.
+    It also covers the negotiated Content-Encoding, so the gzip and identity
+    bodies get distinct tags and the compression cache can key on them.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET':
+            return view(*args, **kwargs)
+        # Taken before the view reads the store: a write in between can only
+        # make the next poll refetch, never hide the change behind a 304.
+        stamp, modified = complaint_log.version()
+        etag = hashlib.blake2b(
+            f"{stamp}|{request.full_path}|{request.headers.get('Accept', '')}|"
+            f"{negotiated_encoding()}".encode(),
+            digest_size=12,
+        ).hexdigest()
+        last_modified = datetime.utcfromtimestamp(int(modified))
+
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            # HTTP dates have whole seconds, so a write later in the second that
+            # Last-Modified names carries the same date. Only a store last
+            # written a full second before the client's date is unchanged.
+            since = request.if_modified_since
+            not_modified = since is not None and modified + 1 <= since.timestamp()
+        if not_modified:
+            response = Response(status=304)
+        else:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.vary.update(('Accept', 'Accept-Encoding'))
+        return response
+    return wrapper
+
+# Records per chunk when streaming; small enough for a fast first byte
+STREAM_BATCH_SIZE = 200
+
+def _wants_stream():
+    """Return 'ndjson', 'json' or None for the requested listing format."""
+    stream = request.args.get('stream', '').lower()
+    if stream in ('ndjson', 'json'):
+        return stream
+    if request.accept_mimetypes.best == 'application/x-ndjson':
+        return 'ndjson'
+    return None
+
+def _stream_complaints(complaints, fmt):
+    """Serialize complaints chunk by chunk as NDJSON or as the usual JSON envelope."""
+    def generate():
+        batch = []
+        first = True
+        if fmt == 'json':
+            yield b'{"success":true,"data":['
+        for complaint in complaints:
+            if fmt == 'ndjson':
+                batch.append(dumps(complaint) + b'\n')
+            else:
+                batch.append((b'' if first else b',') + dumps(complaint))
+                first = False
+            if len(batch) >= STREAM_BATCH_SIZE:
+                yield b''.join(batch)
+                batch = []
+        if batch:
+            yield b''.join(batch)
+        if fmt == 'json':
+            yield b']}'
+
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
 @app.route('/api/complaints', methods=['GET'])
+@conditional
 def get_complaints():
     try:
-        with open(COMPLAINTS_FILE, 'r') as f:
-            complaints = json.load(f)
-        return jsonify({'success': True, 'data': complaints}), 200
-    except FileNotFoundError:
-        return jsonify({'success': False, 'data': []}), 200
+        query = parse_query_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    # status/priority/department filters are answered by the secondary index;
+    # the remaining filters are checked on its (much smaller) candidate list.
+    candidates = complaint_log.select('fields', query['filters'])
+
+    stream = _wants_stream()
+    if stream and query['limit'] is None:
+        complaints = (
+            project(c, query['fields'])
+            for c in (candidates if candidates is not None else complaint_log.iter_complaints())
+            if complaint_matches(c, query['filters'])
+        )
+        return _stream_complaints(complaints, stream)
+
+    if candidates is None:
+        candidates = complaint_log.load()
+    complaints, next_cursor = select_complaints(candidates, order=complaint_log.order('fields'),
+                                                **query)
+    response = {'success': True, 'data': complaints}
+    if query['limit'] is not None:
+        response['nextCursor'] = next_cursor
+    return jsonify(response), 200
+
+@app.route('/api/complaints/export', methods=['GET'])
+def export_complaints_download():
+    """Stream complaints as CSV or Parquet, with the listing filters and ?columns=."""
+    fmt = request.args.get('format', 'csv').lower()
+    try:
+        query = parse_query_args(request.args)
+        # Exports cover archived complaints too, so they scan rather than use the index.
+        chunks = export_complaints(
+            complaint_log.iter_complaints(include_archived=True),
+            fmt, parse_columns(request.args.get('columns')), query['filters'],
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return Response(
+        stream_with_context(chunks),
+        mimetype=MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename=complaints.{fmt}'},
+    )
+
+@app.route('/api/complaints/import', methods=['POST'])
+def import_complaints_upload():
+    """Bulk import a CSV or NDJSON upload (multipart ``file`` or the raw body)."""
+    upload = request.files.get('file')
+    if upload:
+        raw, fmt = upload.stream, detect_format(upload.filename, upload.mimetype)
+    else:
+        raw, fmt = request.stream, detect_format(None, request.mimetype)
+    fmt = request.args.get('format') or fmt
+    if fmt is None:
+        return jsonify({'success': False, 'error': 'Unknown format; pass ?format=csv or ?format=ndjson'}), 400
+
+    try:
+        summary = import_complaints(
+            decode_lines(raw), fmt,
+            domain=request.args.get('domain', 'default'),
+            analyze=request.args.get('analyze', 'true').lower() != 'false',
+        )
+    except FileNotFoundError as e:
+        # The sbackend models are not available
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, **summary}), 200
+
+# Results returned by /api/complaints/search unless ?limit= is given
+SEARCH_LIMIT = 20
+
+@app.route('/api/complaints/search', methods=['GET'])
+@conditional
+def search_complaints():
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'success': False, 'error': 'q is required'}), 400
+    try:
+        query = parse_query_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    # Ranked by BM25, best match first; "term*" matches by prefix.
+    matches = complaint_log.select('search', q, query['limit'] or SEARCH_LIMIT)
+    return jsonify({'success': True, 'data': [project(c, query['fields']) for c in matches]}), 200
+
+def _missing_complaint(complaint_id):
+    # Archived complaints can still be read, but not changed or deleted.
+    if complaint_log.is_archived(complaint_id):
+        return jsonify({'error': 'Complaint is archived and can no longer be changed'}), 409
+    return jsonify({'error': 'Complaint not found'}), 404
+
+@app.route('/api/complaints/<complaint_id>', methods=['GET', 'PATCH', 'DELETE'])
+@conditional
+def handle_complaint(complaint_id):
+    if request.method == 'GET':
+        complaint = complaint_log.get(complaint_id)
+        if not complaint:
+            return jsonify({'error': 'Complaint not found'}), 404
+        return jsonify(complaint), 200
+
+    if request.method == 'PATCH':
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'A JSON object with the fields to update is required'}), 400
+        data.pop('id', None)
+        complaint = complaint_log.update(complaint_id, data)
+        if not complaint:
+            return _missing_complaint(complaint_id)
+        return jsonify(complaint), 200
+
+    if not complaint_log.delete(complaint_id):
+        return _missing_complaint(complaint_id)
+    return '', 204
 
 @app.route('/api/analytics', methods=['GET'])
+@conditional
 def get_analytics():
+    # Counters are maintained on every write, so this never walks the complaints.
+    return jsonify(complaint_log.aggregate('counters', ComplaintCounters.summary)), 200
+
+@app.route('/api/analytics/timeseries', methods=['GET'])
+@conditional
+def get_analytics_timeseries():
+    bucket = request.args.get('bucket', 'day')
     try:
-        with open(COMPLAINTS_FILE, 'r') as f:
-            complaints = json.load(f)
-
-        total_complaints = len(complaints)
-        resolved_count = sum(1 for c in complaints if c['status'] == 'resolved')
-        pending_count = sum(1 for c in complaints if c['status'] == 'pending')
-
-        category_distribution = {}
-        for c in complaints:
-            category = c.get('category', 'Other')
-            if category in category_distribution:
-                category_distribution[category] += 1
-            else:
-                category_distribution[category] = 1
-
-        analytics_data = {
-            'total_complaints': total_complaints,
-            'resolved_count': resolved_count,
-            'pending_count': pending_count,
-            'category_distribution': category_distribution
-        }
-        return jsonify(analytics_data), 200
-    except FileNotFoundError:
-        return jsonify({'error': 'Complaints file not found'}), 500
+        # series() also drops expired hourly buckets, so it must not race a write.
+        series = complaint_log.aggregate('rollups', lambda rollups: rollups.series(
+            bucket, request.args.get('from'), request.args.get('to')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'bucket': bucket, 'data': series}), 200
 
 if __name__ == '__main__':
     app.run(debug=True, port=5001)
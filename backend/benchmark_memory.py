@@ -0,0 +1,108 @@
+"""Compare gunicorn worker memory with and without preload_app (Linux only).
+
+Starts the app under gunicorn_config.py twice, with GUNICORN_PRELOAD=0 and 1.
+Once every worker answers the health check, it reads /proc/<pid>/smaps_rollup
+of the master and each worker. RSS counts shared pages in full in every
+process; PSS divides them between the processes sharing them, so the PSS
+total is what the server really costs.
+
+Usage (from ``backend/``):
+
+    python benchmark_memory.py
+    python benchmark_memory.py --app-dir ../sbackend/camplaint-analyzer --health /health
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List
+
+FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    usage = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in FIELDS:
+                usage[name] = int(value.split()[0])
+    return usage
+
+
+def children(pid: int) -> List[int]:
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name is parenthesised and may contain spaces
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def measure(app_dir: str, preload: bool, workers: int, port: int, health: str,
+            settle: float) -> List[Dict[str, int]]:
+    """Memory of the master followed by each worker."""
+    env = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0')
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_config.py', '--workers', str(workers),
+         '--bind', f'127.0.0.1:{port}', 'app:app'],
+        cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 120
+        while True:
+            if master.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with {master.returncode}")
+            if time.monotonic() > deadline:
+                raise RuntimeError("gunicorn did not come up within 120s")
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}{health}', timeout=5).read()
+                if len(children(master.pid)) >= workers:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.5)
+        # Give the other workers time to finish their own start-up
+        time.sleep(settle)
+        return [memory_kb(pid) for pid in [master.pid] + children(master.pid)]
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Per-worker RSS/PSS with and without preload.")
+    parser.add_argument('--app-dir', default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument('--health', default='/api/health', help="path answered once a worker is up")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=18000)
+    parser.add_argument('--settle', type=float, default=5.0,
+                        help="seconds to wait after the first health check")
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<12}{'worker':>7}" + ''.join(f'{field:>15}' for field in FIELDS) + '  (kB)')
+    for preload in (False, True):
+        mode = 'preload' if preload else 'no preload'
+        usages = measure(args.app_dir, preload, args.workers, args.port, args.health, args.settle)
+        for i, usage in enumerate(usages):
+            label = 'master' if i == 0 else str(i)
+            print(f"{mode:<12}{label:>7}" + ''.join(f'{usage.get(f, 0):>15}' for f in FIELDS))
+        # PSS adds up to the real total; the master holds a share of the preloaded pages
+        totals = {f: sum(u.get(f, 0) for u in usages) for f in FIELDS}
+        print(f"{mode:<12}{'total':>7}" + ''.join(f'{totals[f]:>15}' for f in FIELDS))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Streaming bulk export of complaints to CSV or Parquet.
+
+Complaints are read one at a time from a store iterator (archived ones
+included) and written out in small chunks, so memory stays flat however many
+complaints are exported.
+Nested objects such as the ``analysis`` block are flattened into dotted
+columns (``analysis.category``). Parquet needs the optional ``pyarrow``
+package and is written one row group at a time.
+
+Usage (from ``backend/``):
+
+    python bulk_export.py complaints.csv --status pending
+    python bulk_export.py report.parquet --source domains --columns id,category,analysis.priority
+    python bulk_export.py sb.csv --source ../sbackend/camplaint-analyzer/data/complaints.json
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+
+from storage.id_index import iter_json_array
+from storage.query import FILTER_FIELDS, RANGE_PARAMS, complaint_matches
+from storage.serialization import dumps_str
+
+DEFAULT_COLUMNS = (
+    'id', 'domain', 'title', 'description', 'category', 'priority', 'department',
+    'userType', 'status', 'createdAt', 'timestamp',
+    'analysis.category', 'analysis.priority', 'analysis.type',
+    'analysis.assignedDepartment', 'analysis.aiConfidence',
+)
+# Columns written as numbers in Parquet; everything else is a string
+NUMERIC_COLUMNS = ('analysis.aiConfidence',)
+
+# Rows per CSV chunk / Parquet row group
+EXPORT_CHUNK_ROWS = 1000
+
+EXPORT_FORMATS = ('csv', 'parquet')
+MIMETYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+def available_formats() -> List[str]:
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or pa is not None]
+
+
+def column_value(complaint: Mapping[str, Any], column: str) -> Any:
+    """Read a possibly dotted column, e.g. ``analysis.category``; None if missing."""
+    value: Any = complaint
+    for part in column.split('.'):
+        if not isinstance(value, Mapping):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _cell(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return dumps_str(value)
+    return str(value)
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def export_csv(complaints: Iterable[Mapping[str, Any]],
+               columns: Sequence[str] = DEFAULT_COLUMNS) -> Iterator[str]:
+    """Yield a CSV document chunk by chunk, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = 0
+    for complaint in complaints:
+        writer.writerow([_cell(column_value(complaint, column)) or '' for column in columns])
+        rows += 1
+        if rows % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands its bytes over on request; keeps no history."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Parquet records absolute offsets, so report the total written so far.
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def export_parquet(complaints: Iterable[Mapping[str, Any]],
+                   columns: Sequence[str] = DEFAULT_COLUMNS) -> Iterator[bytes]:
+    """Yield a Parquet file chunk by chunk, one row group at a time."""
+    if pa is None:
+        raise RuntimeError("Parquet export requires pyarrow")
+    schema = pa.schema([
+        (column, pa.float64() if column in NUMERIC_COLUMNS else pa.string()) for column in columns
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def row_group(batch):
+        arrays = {
+            column: [(_number if column in NUMERIC_COLUMNS else _cell)(column_value(c, column))
+                     for c in batch]
+            for column in columns
+        }
+        writer.write_table(pa.table(arrays, schema=schema))
+        return sink.drain()
+
+    batch = []
+    for complaint in complaints:
+        batch.append(complaint)
+        if len(batch) >= EXPORT_CHUNK_ROWS:
+            yield row_group(batch)
+            batch = []
+    if batch:
+        yield row_group(batch)
+    writer.close()
+    yield sink.drain()
+
+
+def export_complaints(complaints: Iterable[Mapping[str, Any]], fmt: str = 'csv',
+                      columns: Optional[Sequence[str]] = None,
+                      filters: Optional[Mapping[str, Any]] = None) -> Iterator[Any]:
+    """Filter complaints lazily and stream them in ``fmt``; raises ValueError for bad options."""
+    if fmt not in available_formats():
+        raise ValueError(f"format must be one of {', '.join(available_formats())}")
+    columns = list(columns or DEFAULT_COLUMNS)
+    if filters:
+        complaints = (c for c in complaints if complaint_matches(c, filters))
+    return export_csv(complaints, columns) if fmt == 'csv' else export_parquet(complaints, columns)
+
+
+def parse_columns(value: Optional[str]) -> Optional[List[str]]:
+    return [c.strip() for c in (value or '').split(',') if c.strip()] or None
+
+
+def _iter_source(source: str) -> Iterator[Dict[str, Any]]:
+    """Complaints from the API log ('log'), the domain files ('domains') or a JSON array file."""
+    if source == 'log':
+        from utils.complaint_utils import complaint_log
+        return complaint_log.iter_complaints(include_archived=True)
+    if source == 'domains':
+        from complaint_manager import complaint_manager
+        return complaint_manager.iter_complaints(include_archived=True)
+
+    def from_file():
+        with open(source, 'r', encoding='utf-8') as f:
+            yield from iter_json_array(f)
+    return from_file()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export complaints to CSV or Parquet.")
+    parser.add_argument('path', help="output file, or - for stdout")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, help="default: from the file extension")
+    parser.add_argument('--source', default='log',
+                        help="'log' (API complaints), 'domains' (complaint_manager) or a JSON file")
+    parser.add_argument('--columns', help="comma-separated columns, e.g. id,analysis.category")
+    for field in FILTER_FIELDS:
+        parser.add_argument(f'--{field}')
+    for param, key in RANGE_PARAMS.items():
+        parser.add_argument(f'--{key.replace("_", "-")}', dest=key, help=f"like ?{param}=")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or os.path.splitext(args.path)[1].lstrip('.') or 'csv'
+    filters = {key: getattr(args, key) for key in (*FILTER_FIELDS, *RANGE_PARAMS.values())
+               if getattr(args, key)}
+    try:
+        chunks = export_complaints(_iter_source(args.source), fmt, parse_columns(args.columns),
+                                   filters)
+    except ValueError as e:
+        parser.error(str(e))
+
+    binary = fmt == 'parquet'
+    if args.path == '-':
+        out = sys.stdout.buffer if binary else sys.stdout
+        for chunk in chunks:
+            out.write(chunk)
+    else:
+        with open(args.path, 'wb' if binary else 'w', **({} if binary else {'newline': ''})) as out:
+            for chunk in chunks:
+                out.write(chunk)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Bulk import of historical complaints.
+
+Reads NDJSON or CSV in the shape of the training CSVs
+(``complaint_text,category,priority,department,type``, extra columns are kept),
+classifies the rows in batches with the four sbackend models, and appends each
+batch to the complaint log with one write, so imported complaints show up in
+the listing, search, analytics and exports like any other. Every row gets a
+new domain-prefixed id (``EDU-0042``); each batch reserves the ids it needs
+with one sequence update per domain. A bad row is reported and skipped; it
+never aborts the rest of the import.
+
+Usage (from ``backend/``):
+
+    python bulk_import.py complaints.csv --domain education
+    python bulk_import.py history.ndjson --format ndjson --no-analysis
+"""
+
+import argparse
+import csv
+import sys
+from datetime import datetime
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.ai_analyzer import analyze_texts, ensure_models_loaded
+from storage.serialization import JSONDecodeError, loads
+from utils.complaint_utils import complaint_log, complaint_sequences
+
+# Rows classified and committed together
+IMPORT_BATCH_SIZE = 1000
+# Per-row errors included in the summary; the count is always exact
+MAX_REPORTED_ERRORS = 100
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+def decode_lines(raw: IO[bytes]) -> Iterator[str]:
+    """Yield the UTF-8 lines of a binary stream.
+
+    Each line is decoded on its own, so invalid input raises UnicodeDecodeError
+    only once every line before it has been yielded.
+    """
+    for line in iter(raw.readline, b''):
+        yield line.decode('utf-8')
+
+
+def iter_rows(stream: Iterable[str], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (row number, row) pairs; an unparseable row is yielded as its exception."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for number, row in enumerate(reader, start=1):
+            if None in row:
+                yield number, ValueError("Row has more fields than the header")
+            else:
+                yield number, row
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, loads(line)
+        except JSONDecodeError as e:
+            yield number, ValueError(f"Invalid JSON: {e.msg}")
+
+
+def _complaint_from_row(row: Any, domain: str) -> Dict[str, Any]:
+    """Validate one row and turn it into complaint data; raises ValueError."""
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+    text = row.get('complaint_text')
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("complaint_text is required")
+    complaint = {k: v for k, v in row.items() if k != 'complaint_text' and v not in (None, '')}
+    complaint['description'] = text.strip()
+    # A new id is assigned when the batch is committed
+    complaint.pop('id', None)
+    complaint.setdefault('status', 'pending')
+    complaint.setdefault('domain', domain)
+    complaint.setdefault('createdAt', datetime.utcnow().isoformat())
+    return complaint
+
+
+class _ImportJob:
+    def __init__(self, store, sequences, analyze: bool):
+        self.store = store
+        self.sequences = sequences
+        self.analyze = analyze
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def fail(self, number: int, error: Any) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'error': str(error)})
+
+    def assign_ids(self, complaints: List[Dict[str, Any]]) -> None:
+        """Give every complaint an id, reserving one block per domain."""
+        by_domain: Dict[str, List[Dict[str, Any]]] = {}
+        for complaint in complaints:
+            by_domain.setdefault(str(complaint['domain']), []).append(complaint)
+        for domain, members in by_domain.items():
+            ids = self.sequences.reserve_ids(domain, len(members))
+            for complaint, complaint_id in zip(members, ids):
+                complaint['id'] = complaint_id
+
+    def commit(self, batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        if not batch:
+            return
+        if self.analyze:
+            try:
+                analyses = analyze_texts([complaint['description'] for _, complaint in batch])
+            except Exception as e:
+                for number, _ in batch:
+                    self.fail(number, f"Analysis failed: {e}")
+                return
+            for (_, complaint), analysis in zip(batch, analyses):
+                complaint['analysis'] = analysis
+
+        complaints = [complaint for _, complaint in batch]
+        try:
+            # A failed write only leaves a gap in the sequence, never a duplicate id.
+            self.assign_ids(complaints)
+            # One write, fsynced, per batch
+            self.store.append_many(complaints, fsync=True)
+        except Exception as e:
+            for number, _ in batch:
+                self.fail(number, f"Save failed: {e}")
+        else:
+            self.imported += len(batch)
+
+    def summary(self) -> Dict[str, Any]:
+        return {'imported': self.imported, 'failed': self.failed, 'errors': self.errors}
+
+
+def import_complaints(stream: Iterable[str], fmt: str = 'csv', domain: str = 'default',
+                      analyze: bool = True, batch_size: int = IMPORT_BATCH_SIZE,
+                      store=None, sequences=None) -> Dict[str, Any]:
+    """Import complaints from text lines (see :func:`decode_lines`) and return a summary.
+
+    Rows without a ``domain`` column go to ``domain``. ``store`` defaults to
+    the shared :class:`storage.complaint_log.ComplaintLog` and ``sequences``
+    to its :class:`storage.sequence.SequenceAllocator`. The summary holds
+    the imported and failed counts and the first MAX_REPORTED_ERRORS row errors.
+    Input that is not valid UTF-8 ends the import at that point; it is reported
+    like a row error, and the rows read before it are still imported.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(IMPORT_FORMATS)}")
+    if analyze:
+        # Fail fast, before reading any input, if the models are missing.
+        ensure_models_loaded()
+
+    job = _ImportJob(store or complaint_log, sequences or complaint_sequences, analyze)
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    rows = iter_rows(stream, fmt)
+    number = 0
+    while True:
+        try:
+            number, row = next(rows)
+        except StopIteration:
+            break
+        except UnicodeDecodeError as e:
+            # Nothing after this point can be read; keep what was read so far.
+            job.fail(number + 1, f"Input is not valid UTF-8 ({e.reason}); the rest was not read")
+            break
+        try:
+            if isinstance(row, Exception):
+                raise row
+            batch.append((number, _complaint_from_row(row, domain)))
+        except ValueError as e:
+            job.fail(number, e)
+            continue
+        if len(batch) >= batch_size:
+            job.commit(batch)
+            batch = []
+    job.commit(batch)
+    return job.summary()
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> Optional[str]:
+    """Guess the import format from a file name or content type."""
+    if content_type:
+        if 'csv' in content_type:
+            return 'csv'
+        if 'ndjson' in content_type or 'jsonl' in content_type:
+            return 'ndjson'
+    if filename:
+        if filename.endswith('.csv'):
+            return 'csv'
+        if filename.endswith(('.ndjson', '.jsonl')):
+            return 'ndjson'
+    return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import complaints from CSV or NDJSON.")
+    parser.add_argument('path', help="input file, or - for stdin")
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help="default: from the file extension")
+    parser.add_argument('--domain', default='default', help="domain for rows without one")
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument('--no-analysis', action='store_true', help="skip AI classification")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("cannot tell the format from the file name; pass --format")
+
+    if args.path == '-':
+        summary = import_complaints(decode_lines(sys.stdin.buffer), fmt, args.domain,
+                                    not args.no_analysis, args.batch_size)
+    else:
+        with open(args.path, 'rb') as raw:
+            summary = import_complaints(decode_lines(raw), fmt, args.domain,
+                                        not args.no_analysis, args.batch_size)
+
+    print(f"Imported {summary['imported']} complaints, {summary['failed']} failed")
+    for error in summary['errors']:
+        print(f"  row {error['row']}: {error['error']}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,14 @@
-import json
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from storage.archive import ARCHIVE_AFTER_DAYS, ComplaintArchive, archive_cutoff, is_archivable
+from storage.id_index import ComplaintIndex, dump_records, iter_json_array, read_span
+from storage.locking import atomic_write, file_lock
+from storage.query import DEFAULT_PAGE_SIZE, select_complaints
+from storage.sequence import SequenceAllocator, id_number
+from storage.serialization import JSONDecodeError, load_file
 
 # Base data directory
 DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
@@ -16,6 +22,10 @@ DOMAIN_FILES = {
     'default': 'other_complaints.json'
 }
 
+# Storage engine: 'json' (one file per domain) or 'sqlite'
+COMPLAINT_STORE = os.getenv('COMPLAINT_STORE', 'json').lower()
+SQLITE_PATH = os.getenv('COMPLAINT_DB_PATH', os.path.join(DATA_DIR, 'complaints.db'))
+
 class ComplaintManager:
     def __init__(self, data_dir: str = DATA_DIR):
         """Initialize the complaint manager with the data directory."""
@@ -26,22 +36,68 @@ class ComplaintManager:
         for domain, filename in DOMAIN_FILES.items():
             filepath = os.path.join(self.data_dir, filename)
             if not os.path.exists(filepath):
-                with open(filepath, 'w') as f:
-                    json.dump([], f)
-    
+                atomic_write(filepath, b'[]')
+
+        # id -> (domain, byte span) index, rebuilt for any file changed since last run
+        self._index = ComplaintIndex(self.data_dir, DOMAIN_FILES)
+        # Per-prefix id counters, so a new id never needs the domain file
+        self._sequences = SequenceAllocator(
+            os.path.join(self.data_dir, 'complaint_sequences.json'), seed=self._max_id_number
+        )
+        # Old resolved complaints, moved out of the domain files by archive_resolved()
+        self._archive = ComplaintArchive(os.path.join(self.data_dir, 'archive', 'domains'))
+
+    def _domain_key(self, domain: str) -> str:
+        """Get the DOMAIN_FILES key a domain is stored under."""
+        domain = domain.lower()
+        return domain if domain in DOMAIN_FILES else 'default'
+
     def _get_domain_file(self, domain: str) -> str:
         """Get the file path for a given domain."""
-        filename = DOMAIN_FILES.get(domain.lower(), DOMAIN_FILES['default'])
-        return os.path.join(self.data_dir, filename)
+        return os.path.join(self.data_dir, DOMAIN_FILES[self._domain_key(domain)])
     
-    def get_complaints(self, domain: Optional[str] = None) -> List[Dict]:
-        """Get all complaints, optionally filtered by domain."""
+    def get_complaints(self, domain: Optional[str] = None,
+                       fields: Optional[Sequence[str]] = None, **filters) -> List[Dict]:
+        """Get all complaints, optionally filtered by domain and storage.query filters.
+
+        ``filters`` accepts status, priority, department, category, created_from
+        and created_to; ``fields`` projects each complaint onto those keys.
+        """
+        complaints = self._load_complaints(domain)
+        if fields or filters:
+            complaints, _ = select_complaints(complaints, filters, fields)
+        return complaints
+
+    def get_complaints_page(self, domain: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                            cursor: Optional[str] = None, fields: Optional[Sequence[str]] = None,
+                            **filters) -> Tuple[List[Dict], Optional[str]]:
+        """Like get_complaints, but one page at a time; returns (page, next_cursor)."""
+        return select_complaints(self._load_complaints(domain), filters, fields, limit, cursor)
+
+    def iter_complaints(self, domain: Optional[str] = None,
+                        include_archived: bool = False) -> Iterator[Dict]:
+        """Yield complaints one at a time without loading whole domain files."""
+        domain_files = [DOMAIN_FILES[self._domain_key(domain)]] if domain else DOMAIN_FILES.values()
+        for domain_file in domain_files:
+            filepath = os.path.join(self.data_dir, domain_file)
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    yield from iter_json_array(f)
+            except (JSONDecodeError, FileNotFoundError):
+                continue
+        if include_archived:
+            wanted = self._domain_key(domain) if domain else None
+            for complaint in self._archive.iter_complaints():
+                if wanted is None or self._domain_key(complaint.get('domain') or '') == wanted:
+                    yield complaint
+
+    def _load_complaints(self, domain: Optional[str] = None) -> List[Dict]:
+        """Read one domain file, or all of them when no domain is given."""
         if domain:
             filepath = self._get_domain_file(domain)
             try:
-                with open(filepath, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
+                return load_file(filepath)
+            except (JSONDecodeError, FileNotFoundError):
                 return []
         else:
             all_complaints = []
@@ -49,50 +105,109 @@ class ComplaintManager:
                 filepath = os.path.join(self.data_dir, domain_file)
                 if os.path.exists(filepath):
                     try:
-                        with open(filepath, 'r') as f:
-                            domain_complaints = json.load(f)
-                            all_complaints.extend(domain_complaints)
-                    except (json.JSONDecodeError, FileNotFoundError):
+                        all_complaints.extend(load_file(filepath))
+                    except (JSONDecodeError, FileNotFoundError):
                         continue
             return all_complaints
     
+    def _max_id_number(self, prefix: str) -> int:
+        """Highest id number in use for a prefix; seeds a new sequence once."""
+        numbers = (id_number(c.get('id'), prefix)
+                   for c in self.iter_complaints(include_archived=True))
+        return max((n for n in numbers if n is not None), default=0)
+
+    def reserve_ids(self, domain: str, count: int = 1) -> List[str]:
+        """Reserve a block of unique ids for complaints of a domain."""
+        return self._sequences.reserve_ids(domain, count)
+
     def save_complaint(self, complaint_data: Dict, domain: str = 'default') -> Dict:
         """Save a new complaint to the appropriate domain file."""
         if 'domain' in complaint_data:
             domain = complaint_data['domain']
-        
+        return self.save_complaints([complaint_data], domain)[0]
+
+    def save_complaints(self, complaints_data: List[Dict], domain: str = 'default') -> List[Dict]:
+        """Save several new complaints of one domain with a single file rewrite."""
+        if not complaints_data:
+            return []
         filepath = self._get_domain_file(domain)
-        
-        # Load existing complaints
-        try:
-            with open(filepath, 'r') as f:
-                complaints = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            complaints = []
-        
+        complaint_ids = self.reserve_ids(domain, len(complaints_data))
+        timestamp = datetime.now().isoformat()
+
         # Add metadata
-        complaint = {
-            "id": f"{domain[:3].upper()}-{len(complaints) + 1:04d}",
-            "domain": domain,
-            "timestamp": datetime.now().isoformat(),
-            **{k: v for k, v in complaint_data.items() if k != 'domain'}
-        }
-        
-        # Save updated complaints
-        complaints.append(complaint)
-        with open(filepath, 'w') as f:
-            json.dump(complaints, f, indent=2)
-        
-        return complaint
+        new_complaints = [
+            {
+                "id": complaint_id,
+                "domain": domain,
+                "timestamp": timestamp,
+                **{k: v for k, v in complaint_data.items() if k != 'domain'}
+            }
+            for complaint_id, complaint_data in zip(complaint_ids, complaints_data)
+        ]
+
+        # Writers of the same domain are serialized across worker processes;
+        # other domains can be written in parallel.
+        with file_lock(filepath):
+            # Load existing complaints
+            try:
+                complaints = load_file(filepath)
+            except (JSONDecodeError, FileNotFoundError):
+                complaints = []
+
+            # Save updated complaints
+            complaints.extend(new_complaints)
+            body, spans = dump_records(complaints)
+            atomic_write(filepath, body)
+            self._index.record_write(self._domain_key(domain), complaints, spans)
+
+        return new_complaints
     
     def get_complaint_by_id(self, complaint_id: str) -> Optional[Dict]:
-        """Get a specific complaint by its ID."""
-        for domain in list(DOMAIN_FILES.keys()) + ['default']:
-            complaints = self.get_complaints(domain)
-            for complaint in complaints:
-                if complaint.get('id') == complaint_id:
-                    return complaint
+        """Get a specific complaint by its ID, including archived ones."""
+        for _ in range(2):
+            location = self._index.lookup(complaint_id)
+            if location is None:
+                return self._archive.get(complaint_id)
+            complaint = read_span(*location)
+            if complaint is not None and str(complaint.get('id')) == str(complaint_id):
+                return complaint
+            # The file was rewritten after the lookup; lookup() re-indexes it.
         return None
 
+    def archive_resolved(self, older_than_days: int = ARCHIVE_AFTER_DAYS) -> int:
+        """Move resolved complaints older than the cutoff out of the domain files.
+
+        Returns how many were archived; they stay readable by id and in exports.
+        """
+        cutoff = archive_cutoff(older_than_days)
+        archived = 0
+        for domain in DOMAIN_FILES:
+            filepath = self._get_domain_file(domain)
+            with file_lock(filepath):
+                try:
+                    complaints = load_file(filepath)
+                except (JSONDecodeError, FileNotFoundError):
+                    continue
+                old = [c for c in complaints if is_archivable(c, cutoff)]
+                if not old:
+                    continue
+                # Durable in the archive before they leave the domain file.
+                self._archive.write(old)
+                remaining = [c for c in complaints if not is_archivable(c, cutoff)]
+                body, spans = dump_records(remaining)
+                atomic_write(filepath, body)
+                self._index.record_write(domain, remaining, spans)
+            archived += len(old)
+        return archived
+
+def _create_complaint_store():
+    """Build the configured storage engine behind the ComplaintManager API."""
+    if COMPLAINT_STORE == 'sqlite':
+        from storage.sqlite_store import SQLiteComplaintStore
+        store = SQLiteComplaintStore(SQLITE_PATH, DOMAIN_FILES)
+        store.migrate_json_files(DATA_DIR)
+        return store
+    return ComplaintManager()
+
 # Create a global instance for easy import
-complaint_manager = ComplaintManager()
+complaint_manager = _create_complaint_store()
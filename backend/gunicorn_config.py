@@ -1,4 +1,33 @@
-workers = 4
-worker_class = 'uvicorn.workers.UvicornWorker'
+import gc
+import os
+
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+# Threads let concurrent requests share group commits within a worker
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
 timeout = 120
-bind = '0.0.0.0:10000'  # Render will use PORT environment variable
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"  # Render sets PORT
+
+# Import the app and load the models once in the master; the forked workers
+# share those pages copy-on-write instead of each loading their own copy.
+# GUNICORN_PRELOAD=0 loads them in every worker instead (e.g. for --reload).
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') != '0'
+
+
+def _warm_up():
+    from services.ai_analyzer import warm_up
+    warm_up()
+
+
+def on_starting(server):
+    if preload_app:
+        _warm_up()
+        # Move everything loaded so far out of the collector's reach, so a
+        # collection in a worker does not write to (and so copy) shared pages.
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        # Still keep the model load off the first request
+        _warm_up()
@@ -1,63 +1,84 @@
 import logging
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Sequence
 
-import joblib
+from services.analysis_cache import AnalysisCache
+from services.classifier import Classifier
 
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 MODELS_DIR = PROJECT_ROOT / "sbackend" / "camplaint-analyzer" / "models"
 
+# Classified once at startup so the first request does not pay for it
+WARM_UP_TEXT = "The projector in the main lecture hall has stopped working."
 
-def _load_model(model_name: str):
-    model_path = MODELS_DIR / f"{model_name}_model.pkl"
-    if not model_path.exists():
-        raise FileNotFoundError(
-            f"Model file '{model_path}' not found. "
-            "Ensure sbackend models are trained and available."
-        )
-    logging.info("Loading %s model from %s", model_name, model_path)
-    return joblib.load(model_path)
+# Analyses by normalized text and model version (ANALYSIS_CACHE_SIZE entries)
+analysis_cache = AnalysisCache()
 
 
 @lru_cache(maxsize=1)
-def _load_models() -> Dict[str, Any]:
+def _load_models() -> Classifier:
+    """Load the numpy scorer, else the fused model, else the four per-head pipelines.
+
+    The classifier's version keys the analysis cache.
+    """
     if not MODELS_DIR.exists():
         raise FileNotFoundError(
             f"Models directory '{MODELS_DIR}' not found. "
             "Make sure sbackend is present with trained models."
         )
+    return Classifier.load(str(MODELS_DIR))
 
-    return {
-        "category": _load_model("category"),
-        "priority": _load_model("priority"),
-        "type": _load_model("type"),
-        "department": _load_model("department"),
-    }
 
+def ensure_models_loaded() -> None:
+    """Load the models now; raises FileNotFoundError if they are missing."""
+    _load_models()
+
+
+def reload_models() -> None:
+    """Forget the loaded models and their cached analyses; the next call reloads."""
+    _load_models.cache_clear()
+    analysis_cache.clear()
 
-def analyze_text(text: str) -> Dict[str, Any]:
-    """Run AI analysis against the shared sbackend models."""
-    if not text or not text.strip():
-        raise ValueError("Complaint text cannot be empty.")
 
-    models = _load_models()
-    payload = [text]
+def warm_up() -> None:
+    """Load the models and run one prediction, e.g. in the gunicorn master before fork.
 
-    category = models["category"].predict(payload)[0]
-    priority = models["priority"].predict(payload)[0]
-    compl_type = models["type"].predict(payload)[0]
-    department = models["department"].predict(payload)[0]
+    Images built from ``backend/`` alone carry no models; the API still starts
+    and analysis fails per request, as it did before models were preloaded.
+    """
+    try:
+        classifier = _load_models()
+    except FileNotFoundError as exc:
+        logging.warning("Skipping model warm-up: %s", exc)
+        return
+    classifier.classify([WARM_UP_TEXT])
 
-    proba = models["category"].predict_proba(payload)[0]
-    confidence = round(float(proba.max()) * 100, 2)
 
-    return {
-        "category": category,
-        "priority": priority,
-        "type": compl_type,
-        "assignedDepartment": department,
-        "aiConfidence": confidence,
-    }
+def _analyze(texts: List[str]) -> List[Dict[str, Any]]:
+    """Answer from the analysis cache where possible; classify the rest together."""
+    classifier = _load_models()
+    results = [analysis_cache.get(text, classifier.version) for text in texts]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        for i, analysis in zip(missing, classifier.classify([texts[i] for i in missing])):
+            analysis_cache.put(texts[i], classifier.version, analysis)
+            results[i] = analysis
+    return results
+
+
+def analyze_texts(texts: Sequence[str]) -> List[Dict[str, Any]]:
+    """Analyze many texts at once; each result equals analyze_text() of that text."""
+    for i, text in enumerate(texts):
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f"Complaint text at index {i} is empty.")
+    return _analyze(list(texts)) if texts else []
+
+
+def analyze_text(text: str) -> Dict[str, Any]:
+    """Run AI analysis against the shared sbackend models."""
+    if not text or not text.strip():
+        raise ValueError("Complaint text cannot be empty.")
 
+    return _analyze([text])[0]
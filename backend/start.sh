@@ -11,4 +11,4 @@ echo "Running database migrations..."
 # Example: flask db upgrade
 
 echo "Starting the application..."
-exec gunicorn --bind 0.0.0.0:8000 --workers 4 app:app
+exec gunicorn -c gunicorn_config.py --bind 0.0.0.0:8000 --workers 4 app:app
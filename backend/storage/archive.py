@@ -0,0 +1,175 @@
+"""Cold storage for resolved complaints.
+
+Resolved complaints older than ``ARCHIVE_AFTER_DAYS`` are moved out of the hot
+store into immutable, gzip-compressed segment files. A segment is a series of
+independently compressed blocks of JSON lines, and its small index maps every
+complaint id to the byte range of its block. Reading an archived complaint
+therefore decompresses one block, not the whole segment.
+
+A segment counts as written once its index file exists; both are replaced
+atomically, so a crash mid-archive leaves at most an orphaned segment.
+
+Run ``python -m storage.archive`` from ``backend/`` to archive both the API's
+complaint log and the per-domain files (``--days`` overrides the age).
+"""
+
+import gzip
+import logging
+import os
+import sys
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from storage.locking import atomic_write
+from storage.query import created_at
+from storage.serialization import JSONDecodeError, dumps, load_file, loads
+
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+
+# Complaints per compressed block, and per segment file
+ARCHIVE_BLOCK_RECORDS = 256
+ARCHIVE_SEGMENT_RECORDS = 50_000
+
+_SEGMENT_SUFFIX = '.jsonl.gz'
+_INDEX_SUFFIX = '.idx.json'
+
+# (segment name, block offset, block length)
+Location = Tuple[str, int, int]
+
+
+def archive_cutoff(older_than_days: int = ARCHIVE_AFTER_DAYS) -> str:
+    """ISO timestamp before which resolved complaints are archived."""
+    return (datetime.utcnow() - timedelta(days=older_than_days)).isoformat()
+
+
+def is_archivable(complaint: Mapping[str, Any], cutoff: str) -> bool:
+    created = created_at(complaint)
+    return (str(complaint.get('status') or '').lower() == 'resolved'
+            and bool(created) and created < cutoff)
+
+
+class ComplaintArchive:
+    def __init__(self, archive_dir: str):
+        self.archive_dir = archive_dir
+        os.makedirs(archive_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # id -> where it is archived, for every segment loaded so far
+        self._locations: Dict[str, Location] = {}
+        self._segments: List[str] = []
+        self._dir_signature: Optional[int] = None
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.archive_dir, name + _SEGMENT_SUFFIX)
+
+    def _refresh(self) -> None:
+        """Pick up segments written since the last look (segments never change)."""
+        signature = os.stat(self.archive_dir).st_mtime_ns
+        if signature == self._dir_signature:
+            return
+        self._dir_signature = signature
+        known = set(self._segments)
+        names = sorted(f[:-len(_INDEX_SUFFIX)] for f in os.listdir(self.archive_dir)
+                       if f.endswith(_INDEX_SUFFIX))
+        for name in names:
+            if name in known:
+                continue
+            try:
+                ids = load_file(os.path.join(self.archive_dir, name + _INDEX_SUFFIX))
+            except (OSError, JSONDecodeError):
+                logging.warning("Skipping unreadable archive index for %s", name)
+                continue
+            for complaint_id, (offset, length) in ids.items():
+                self._locations[complaint_id] = (name, offset, length)
+            self._segments.append(name)
+
+    def write(self, complaints: Iterable[Dict[str, Any]]) -> int:
+        """Archive complaints into new segments; returns how many were written.
+
+        The segments are durable when this returns, so the caller can then
+        drop the complaints from the hot store.
+        """
+        complaints = list(complaints)
+        for start in range(0, len(complaints), ARCHIVE_SEGMENT_RECORDS):
+            self._write_segment(complaints[start:start + ARCHIVE_SEGMENT_RECORDS])
+        return len(complaints)
+
+    def _write_segment(self, complaints: List[Dict[str, Any]]) -> None:
+        # Names sort by creation time, so later copies of an id win on load.
+        name = f"segment-{datetime.utcnow():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        blocks = []
+        ids = {}
+        offset = 0
+        for start in range(0, len(complaints), ARCHIVE_BLOCK_RECORDS):
+            chunk = complaints[start:start + ARCHIVE_BLOCK_RECORDS]
+            block = gzip.compress(b''.join(dumps(c) + b'\n' for c in chunk))
+            for complaint in chunk:
+                ids[str(complaint.get('id'))] = (offset, len(block))
+            blocks.append(block)
+            offset += len(block)
+        atomic_write(self._segment_path(name), b''.join(blocks))
+        atomic_write(os.path.join(self.archive_dir, name + _INDEX_SUFFIX),
+                     dumps(ids))
+        with self._lock:
+            # Directory mtimes can be coarse; never miss our own segment.
+            self._dir_signature = None
+
+    def _read_block(self, name: str, offset: int, length: int) -> List[Dict[str, Any]]:
+        with open(self._segment_path(name), 'rb') as f:
+            f.seek(offset)
+            data = gzip.decompress(f.read(length))
+        return [loads(line) for line in data.splitlines() if line.strip()]
+
+    def get(self, complaint_id: Any) -> Optional[Dict[str, Any]]:
+        """Return an archived complaint by id, or None."""
+        key = str(complaint_id)
+        with self._lock:
+            self._refresh()
+            location = self._locations.get(key)
+        if location is None:
+            return None
+        for complaint in self._read_block(*location):
+            if str(complaint.get('id')) == key:
+                return complaint
+        return None
+
+    def contains(self, complaint_id: Any) -> bool:
+        """Whether a complaint with this id has been archived; reads no block."""
+        with self._lock:
+            self._refresh()
+            return str(complaint_id) in self._locations
+
+    def iter_complaints(self) -> Iterator[Dict[str, Any]]:
+        """Yield every archived complaint once, one block in memory at a time."""
+        with self._lock:
+            self._refresh()
+            segments = list(self._segments)
+            locations = dict(self._locations)
+        blocks: Dict[str, set] = {}
+        for segment, offset, length in locations.values():
+            blocks.setdefault(segment, set()).add((offset, length))
+        for name in segments:
+            for offset, length in sorted(blocks.get(name, ())):
+                for complaint in self._read_block(name, offset, length):
+                    # An id archived twice (e.g. after a crash) is yielded from its latest segment.
+                    if locations.get(str(complaint.get('id'))) == (name, offset, length):
+                        yield complaint
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from complaint_manager import complaint_manager
+    from utils.complaint_utils import complaint_log
+
+    parser = argparse.ArgumentParser(description="Archive old resolved complaints.")
+    parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="archive resolved complaints created more than this many days ago")
+    args = parser.parse_args()
+    print(f"Archived {complaint_log.archive_resolved(args.days)} complaints from the complaint log")
+    if hasattr(complaint_manager, 'archive_resolved'):
+        print(f"Archived {complaint_manager.archive_resolved(args.days)} complaints "
+              f"from the domain files")
+    else:
+        sys.exit("The configured complaint store does not support archiving")
@@ -0,0 +1,538 @@
+"""Append-only complaint storage.
+
+Writes go to a JSON-lines log that sits next to the snapshot file
+(``complaints.json`` -> ``complaints.log.jsonl``), so adding a complaint costs
+one appended line plus a flush. Reads rebuild the current state by replaying
+the log over the snapshot, and :meth:`ComplaintLog.compact` folds the log back
+into the snapshot once it grows past a size threshold.
+
+The replayed state is cached in-process. Each read revalidates it with a stat
+of the two files: an unchanged snapshot plus a longer log means only the new
+tail of the log has to be replayed, and anything else forces a full reload.
+
+Writers from several processes are serialized with an advisory lock on the
+log, and every rewritten file is replaced atomically, so readers never need
+the lock.
+
+Aggregates (see :mod:`storage.counters`) are kept in step with every state
+change and persisted to ``complaints.stats.json``. Patch and delete entries
+carry the record's previous value, so a process that only needs the
+aggregates can load the stats file and replay the log tail without ever
+parsing the snapshot; only a missing or stale stats file forces a recount.
+
+Indexes (see :mod:`storage.secondary_index`) follow the cached state the same
+way and :meth:`ComplaintLog.select` answers queries from them. Each one is
+persisted to its own ``complaints.<name>.index.json`` at the same log position
+as the stats, so a restart reloads it instead of rebuilding it, while the cold
+aggregate path never has to parse it.
+
+With an archive (see :mod:`storage.archive`), old resolved complaints are moved
+to compressed segments by ``archive`` log entries. They leave the cached state
+and its indexes but still count in the aggregates, and :meth:`ComplaintLog.get`
+and ``iter_complaints(include_archived=True)`` still find them. Archived
+complaints are read-only: :meth:`ComplaintLog.update` and
+:meth:`ComplaintLog.delete` do not touch them, and
+:meth:`ComplaintLog.is_archived` tells them apart from unknown ids.
+"""
+
+import itertools
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple,
+                    TypeVar)
+
+from storage.archive import ARCHIVE_AFTER_DAYS, archive_cutoff, is_archivable
+from storage.id_index import dump_records, iter_json_array
+from storage.locking import atomic_write, file_lock
+from storage.serialization import JSONDecodeError, dumps, load_file, loads
+
+# Fold the log into the snapshot once it grows past this many bytes.
+COMPACT_THRESHOLD_BYTES = int(os.getenv('COMPLAINT_LOG_COMPACT_BYTES', str(4 * 1024 * 1024)))
+
+# Bump when an aggregate changes what it counts, so stats files written the
+# old way are recounted instead of loaded.
+STATS_FORMAT = 2
+
+T = TypeVar('T')
+
+
+class ComplaintLog:
+    def __init__(self, snapshot_path, compact_threshold: int = COMPACT_THRESHOLD_BYTES,
+                 aggregates: Optional[Mapping[str, Any]] = None,
+                 indexes: Optional[Mapping[str, Any]] = None, archive=None):
+        """Open the log that belongs to the given snapshot file.
+
+        ``aggregates`` maps names to objects with reset/apply/to_dict/load_dict
+        methods, such as :class:`storage.counters.ComplaintCounters`.
+        ``indexes`` maps names to objects with reset/apply/lookup/to_dict/load_dict
+        methods, such as :class:`storage.secondary_index.SecondaryIndex`.
+        ``archive`` is an optional :class:`storage.archive.ComplaintArchive`.
+        """
+        self.snapshot_path = Path(snapshot_path)
+        self.log_path = self.snapshot_path.with_name(f"{self.snapshot_path.stem}.log.jsonl")
+        self.stats_path = self.snapshot_path.with_name(f"{self.snapshot_path.stem}.stats.json")
+        self.compact_threshold = compact_threshold
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Cached state, keyed by str(id), and what it was built from
+        self._lock = threading.RLock()
+        self._state: Optional[Dict[str, Dict[str, Any]]] = None
+        self._snapshot_signature: Optional[Tuple[int, int, int]] = None
+        self._log_offset = 0
+        # Bumped whenever the cached state changes
+        self.generation = 0
+
+        # Aggregates, and the snapshot/log position they reflect
+        self._aggregates = dict(aggregates or {})
+        self._aggregates_signature: Optional[Tuple[int, int, int]] = None
+        self._aggregates_offset: Optional[int] = None
+
+        # In-memory indexes over the cached state
+        self._indexes = dict(indexes or {})
+        self.archive = archive
+
+    # --- Reads ---
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Return all complaints: the snapshot with the log replayed on top.
+
+        The records are shared with the cache and must not be mutated.
+        """
+        with self._lock:
+            return list(self._current_state().values())
+
+    def iter_complaints(self, include_archived: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield all complaints without building a full list.
+
+        A warm cache is iterated directly. Otherwise the snapshot is streamed
+        record by record with the (small) log applied on the fly, so a cold
+        export never holds the whole dataset in memory. Archived complaints
+        follow the hot ones if ``include_archived`` is set.
+        """
+        with self._lock:
+            if self._state is not None:
+                hot = iter(list(self._current_state().values()))
+            else:
+                hot = self._stream_files()
+        if include_archived and self.archive is not None:
+            return itertools.chain(hot, self.archive.iter_complaints())
+        return hot
+
+    def _stream_files(self) -> Iterator[Dict[str, Any]]:
+        entries_by_id: Dict[str, List[Dict[str, Any]]] = {}
+        tail, _ = self._read_log_tail(0)
+        for entry in self._parse_lines(tail):
+            key = str(entry['data'].get('id') if entry.get('op') == 'put' else entry.get('id'))
+            entries_by_id.setdefault(key, []).append(entry)
+
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                for record in iter_json_array(f):
+                    key = str(record.get('id'))
+                    if key in entries_by_id:
+                        record = self._apply_entries(record, entries_by_id.pop(key))
+                    if record is not None:
+                        yield record
+        except FileNotFoundError:
+            pass
+        # Whatever is left was created after the last compaction.
+        for entries in entries_by_id.values():
+            record = self._apply_entries(None, entries)
+            if record is not None:
+                yield record
+
+    @staticmethod
+    def _apply_entries(record: Optional[Dict[str, Any]],
+                       entries: Iterable[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        for entry in entries:
+            op = entry.get('op')
+            if op == 'put':
+                record = entry['data']
+            elif op == 'patch' and record is not None:
+                record = {**record, **entry['data']}
+            elif op in ('delete', 'archive'):
+                record = None
+        return record
+
+    def get(self, complaint_id: Any) -> Optional[Dict[str, Any]]:
+        """Return a single complaint by id, or None; archived complaints included."""
+        with self._lock:
+            complaint = self._current_state().get(str(complaint_id))
+        if complaint is None and self.archive is not None:
+            complaint = self.archive.get(complaint_id)
+        return complaint
+
+    def is_archived(self, complaint_id: Any) -> bool:
+        """Whether the complaint was moved to the archive (and is now read-only)."""
+        return self.archive is not None and self.archive.contains(complaint_id)
+
+    def version(self) -> Tuple[str, float]:
+        """Return a (stamp, last-modified time) pair for the current contents.
+
+        Costs two stats and no parsing. Every write changes the log's size or
+        replaces the snapshot, so the stamp changes whenever any complaint does.
+        """
+        snapshot = self._signature(self.snapshot_path) or (0, 0, 0)
+        log = self._signature(self.log_path) or (0, 0, 0)
+        stamp = '.'.join(f"{part:x}" for part in (*snapshot, *log))
+        return stamp, max(snapshot[1], log[1]) / 1e9
+
+    def select(self, index: str, *args: Any) -> Optional[List[Dict[str, Any]]]:
+        """Return the complaints that index ``index`` looks up for ``args``.
+
+        Returns None if the index cannot answer the query. The records are
+        shared with the cache and must not be mutated.
+        """
+        with self._lock:
+            state = self._current_state()
+            keys = self._indexes[index].lookup(*args)
+            if keys is None:
+                return None
+            return [state[key] for key in keys]
+
+    def order(self, index: str) -> Callable[[str], Optional[int]]:
+        """Insertion-order lookup of index ``index``, e.g. for listing cursors."""
+        return self._indexes[index].order
+
+    def aggregates(self) -> Dict[str, Any]:
+        """Return the up-to-date aggregates, parsing the snapshot only if unavoidable.
+
+        Writers update these objects in place under the log lock; read them
+        through :meth:`aggregate` rather than after this returns.
+        """
+        with self._lock:
+            if self._state is not None:
+                self._current_state()
+            else:
+                self._current_aggregates()
+            return self._aggregates
+
+    def aggregate(self, name: str, query: Callable[[Any], T]) -> T:
+        """Return ``query(aggregate)`` for aggregate ``name``, computed under the log lock.
+
+        ``query`` must copy what it returns, e.g. ``ComplaintCounters.summary``.
+        """
+        with self._lock:
+            return query(self.aggregates()[name])
+
+    def _current_aggregates(self) -> None:
+        """Bring the aggregates up to date from the stats file and the log tail."""
+        snapshot_signature = self._signature(self.snapshot_path)
+        log_signature = self._signature(self.log_path)
+        log_size = log_signature[2] if log_signature else 0
+        if (self._aggregates_offset is None or snapshot_signature != self._aggregates_signature
+                or log_size < self._aggregates_offset):
+            if not self._load_stats(snapshot_signature, log_size):
+                # Recovery: recount from the full state.
+                self._current_state()
+                return
+        if log_size > self._aggregates_offset:
+            tail, consumed = self._read_log_tail(self._aggregates_offset)
+            for entry in self._parse_lines(tail):
+                prev = entry.get('prev')
+                op = entry.get('op')
+                if op == 'archive':
+                    # Archived complaints still count.
+                    continue
+                if op == 'put':
+                    new = entry['data']
+                elif op == 'patch':
+                    new = {**prev, **entry['data']} if prev is not None else None
+                else:
+                    new = None
+                self._apply_aggregates(prev, new)
+            self._aggregates_offset += consumed
+
+    def _apply_aggregates(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        for aggregate in self._aggregates.values():
+            aggregate.apply(old, new)
+
+    def _apply_state_change(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        """Keep aggregates and indexes in step with a change to the cached state."""
+        self._apply_aggregates(old, new)
+        for index in self._indexes.values():
+            index.apply(old, new)
+
+    def _load_stats(self, snapshot_signature, log_size: int) -> bool:
+        """Load persisted aggregates if they were taken from the current snapshot."""
+        try:
+            stats = load_file(self.stats_path)
+        except (FileNotFoundError, JSONDecodeError):
+            return False
+        signature = tuple(stats.get('snapshot') or ()) or None
+        if (stats.get('format') != STATS_FORMAT or signature != snapshot_signature
+                or stats.get('log_offset', 0) > log_size
+                or set(stats.get('aggregates', {})) != set(self._aggregates)):
+            return False
+        for name, aggregate in self._aggregates.items():
+            aggregate.load_dict(stats['aggregates'][name])
+        self._aggregates_signature = snapshot_signature
+        self._aggregates_offset = stats['log_offset']
+        return True
+
+    def _save_stats(self) -> None:
+        if not self._aggregates and not self._indexes:
+            return
+        stats = {
+            'format': STATS_FORMAT,
+            'snapshot': self._aggregates_signature,
+            'log_offset': self._aggregates_offset,
+            'aggregates': {name: a.to_dict() for name, a in self._aggregates.items()},
+        }
+        atomic_write(self.stats_path, dumps(stats), fsync=False)
+        for name, index in self._indexes.items():
+            stored = {'snapshot': stats['snapshot'], 'log_offset': stats['log_offset'],
+                      'index': index.to_dict()}
+            atomic_write(self._index_path(name), dumps(stored), fsync=False)
+
+    def _index_path(self, name: str) -> Path:
+        return self.snapshot_path.with_name(f"{self.snapshot_path.stem}.{name}.index.json")
+
+    def _load_index(self, name: str, snapshot_signature, log_offset: int) -> bool:
+        """Load a persisted index if it was saved at exactly this snapshot and log position."""
+        try:
+            stored = load_file(self._index_path(name))
+        except (FileNotFoundError, JSONDecodeError):
+            return False
+        signature = tuple(stored.get('snapshot') or ()) or None
+        if signature != snapshot_signature or stored.get('log_offset') != log_offset:
+            return False
+        self._indexes[name].load_dict(stored['index'])
+        return True
+
+    @staticmethod
+    def _signature(path: Path) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _current_state(self) -> Dict[str, Dict[str, Any]]:
+        """Revalidate the cached state against the files and return it."""
+        snapshot_signature = self._signature(self.snapshot_path)
+        log_signature = self._signature(self.log_path)
+        log_size = log_signature[2] if log_signature else 0
+
+        if (self._state is None or snapshot_signature != self._snapshot_signature
+                or log_size < self._log_offset):
+            # Snapshot replaced or log truncated (compaction): rebuild from scratch.
+            self._state = self._read_snapshot()
+            self._snapshot_signature = snapshot_signature
+            self.generation += 1
+            recounted = not self._load_stats(snapshot_signature, log_size)
+            if not recounted:
+                # The persisted aggregates already cover the snapshot plus the log up
+                # to their offset; catch the state up to that point without them.
+                head, consumed = self._read_log_tail(0, self._aggregates_offset)
+                self._replay(self._parse_lines(head), self._state, track=False)
+                self._log_offset = consumed
+                stale = [name for name in self._indexes
+                         if not self._load_index(name, snapshot_signature, consumed)]
+            else:
+                self._log_offset = 0
+                for aggregate in self._aggregates.values():
+                    aggregate.reset()
+                for record in self._state.values():
+                    self._apply_aggregates(None, record)
+                if self.archive is not None:
+                    # A complaint still in the snapshot waits for its archive entry.
+                    for record in self.archive.iter_complaints():
+                        if str(record.get('id')) not in self._state:
+                            self._apply_aggregates(None, record)
+                stale = list(self._indexes)
+            for name in stale:
+                index = self._indexes[name]
+                index.reset()
+                for record in self._state.values():
+                    index.apply(None, record)
+            rebuilt = recounted or bool(stale)
+        else:
+            rebuilt = False
+        if log_size > self._log_offset:
+            tail, consumed = self._read_log_tail(self._log_offset)
+            self._replay(self._parse_lines(tail), self._state)
+            self._log_offset += consumed
+            self.generation += 1
+        self._aggregates_signature = self._snapshot_signature
+        self._aggregates_offset = self._log_offset
+        if rebuilt:
+            self._save_stats()
+        return self._state
+
+    def _read_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            records = load_file(self.snapshot_path)
+        except FileNotFoundError:
+            return {}
+        except JSONDecodeError:
+            logging.exception("Complaint snapshot %s is corrupt; starting empty", self.snapshot_path)
+            return {}
+        return {str(record.get('id')): record for record in records}
+
+    def _read_log_tail(self, offset: int, end: Optional[int] = None) -> Tuple[bytes, int]:
+        """Return the complete log lines after ``offset`` (up to ``end``) and their length."""
+        try:
+            with open(self.log_path, 'rb') as f:
+                f.seek(offset)
+                tail = f.read() if end is None else f.read(end - offset)
+        except FileNotFoundError:
+            return b'', 0
+        # Leave a partially written last line for the next read.
+        complete = tail[:tail.rfind(b'\n') + 1]
+        return complete, len(complete)
+
+    def _parse_lines(self, data: bytes) -> Iterable[Dict[str, Any]]:
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                yield loads(line)
+            except JSONDecodeError:
+                # A crash mid-append can leave a torn line behind.
+                logging.warning("Skipping unreadable entry in %s", self.log_path)
+
+    def _replay(self, entries: Iterable[Dict[str, Any]], state: Dict[str, Dict[str, Any]],
+                track: bool = True) -> None:
+        """Apply log entries to ``state``; ``track`` also updates aggregates and indexes."""
+        apply = self._apply_state_change if track else (lambda old, new: None)
+        for entry in entries:
+            op = entry.get('op')
+            if op == 'put':
+                record = entry['data']
+                key = str(record.get('id'))
+                old = state.get(key)
+                state[key] = record
+                apply(old, record)
+            elif op == 'patch':
+                key = str(entry['id'])
+                if key in state:
+                    old = state[key]
+                    # Copy rather than mutate: readers may still hold the old record.
+                    state[key] = {**old, **entry['data']}
+                    apply(old, state[key])
+            elif op == 'delete':
+                old = state.pop(str(entry['id']), None)
+                if old is not None:
+                    apply(old, None)
+            elif op == 'archive':
+                old = state.pop(str(entry['id']), None)
+                if old is not None and track:
+                    # Out of the hot state and its indexes, but still counted.
+                    for index in self._indexes.values():
+                        index.apply(old, None)
+
+    # --- Writes ---
+
+    def append(self, complaint: Dict[str, Any]) -> Dict[str, Any]:
+        """Append a new complaint record."""
+        self._write_entry({'op': 'put', 'data': complaint})
+        return complaint
+
+    def append_many(self, complaints: Iterable[Dict[str, Any]], fsync: bool = False) -> None:
+        """Append several complaints with one write, optionally fsyncing the log.
+
+        This is the batch writer behind :class:`storage.group_commit.GroupCommitter`;
+        with no complaints and ``fsync`` set it only fsyncs earlier appends.
+        """
+        entries = [{'op': 'put', 'data': complaint} for complaint in complaints]
+        if not entries:
+            if fsync and self.log_path.exists():
+                with open(self.log_path, 'ab') as f:
+                    os.fsync(f.fileno())
+            return
+        with self._lock, file_lock(self.log_path):
+            log_size = self._append_locked(*entries, fsync=fsync)
+        self._maybe_compact(log_size)
+
+    def update(self, complaint_id: Any, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Record a partial update; returns the updated complaint, or None if unknown.
+
+        Archived complaints are read-only, so they count as unknown here too.
+        """
+        with self._lock, file_lock(self.log_path):
+            # Under the lock, so no other worker can change the record in between.
+            current = self._current_state().get(str(complaint_id))
+            if current is None:
+                return None
+            log_size = self._append_locked(
+                {'op': 'patch', 'id': complaint_id, 'data': changes, 'prev': current}
+            )
+        self._maybe_compact(log_size)
+        return {**current, **changes}
+
+    def delete(self, complaint_id: Any) -> bool:
+        """Record the removal of a complaint; returns False if it did not exist.
+
+        Archived complaints are read-only and are never removed.
+        """
+        with self._lock, file_lock(self.log_path):
+            current = self._current_state().get(str(complaint_id))
+            if current is None:
+                return False
+            log_size = self._append_locked({'op': 'delete', 'id': complaint_id, 'prev': current})
+        self._maybe_compact(log_size)
+        return True
+
+    def archive_resolved(self, older_than_days: int = ARCHIVE_AFTER_DAYS) -> int:
+        """Move resolved complaints older than the cutoff to the archive.
+
+        Returns how many were archived. The log is compacted afterwards so
+        the snapshot shrinks right away.
+        """
+        if self.archive is None:
+            raise RuntimeError("This complaint log has no archive")
+        cutoff = archive_cutoff(older_than_days)
+        with self._lock, file_lock(self.log_path):
+            complaints = [c for c in self._current_state().values() if is_archivable(c, cutoff)]
+            if not complaints:
+                return 0
+            # Durable in the archive before they leave the hot store.
+            self.archive.write(complaints)
+            self._append_locked(*({'op': 'archive', 'id': c.get('id')} for c in complaints),
+                                fsync=True)
+        self.compact()
+        return len(complaints)
+
+    def _write_entry(self, entry: Dict[str, Any]) -> None:
+        with self._lock, file_lock(self.log_path):
+            log_size = self._append_locked(entry)
+        self._maybe_compact(log_size)
+
+    def _append_locked(self, *entries: Dict[str, Any], fsync: bool = False) -> int:
+        """Append entries while holding the log lock; returns the new log size."""
+        with open(self.log_path, 'ab') as f:
+            f.write(b''.join(dumps(entry) + b'\n' for entry in entries))
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+            log_size = f.tell()
+        # The next read replays this line from the log tail.
+        self.generation += 1
+        return log_size
+
+    def _maybe_compact(self, log_size: int) -> None:
+        if log_size >= self.compact_threshold:
+            self.compact()
+
+    def compact(self) -> None:
+        """Fold the log into a fresh snapshot and truncate the log."""
+        with self._lock, file_lock(self.log_path):
+            # Includes entries other workers appended up to now.
+            complaints = list(self._current_state().values())
+            self._write_snapshot(complaints)
+            # Replaying puts, patches and deletes is idempotent, so a crash between
+            # the replace and the truncate only costs a redundant replay.
+            with open(self.log_path, 'w'):
+                pass
+            self._snapshot_signature = self._signature(self.snapshot_path)
+            self._log_offset = 0
+            self._aggregates_signature = self._snapshot_signature
+            self._aggregates_offset = 0
+            self._save_stats()
+        logging.info("Compacted %d complaints into %s", len(complaints), self.snapshot_path)
+
+    def _write_snapshot(self, complaints: List[Dict[str, Any]]) -> None:
+        atomic_write(self.snapshot_path, dump_records(complaints)[0])
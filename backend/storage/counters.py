@@ -0,0 +1,64 @@
+"""Incrementally maintained complaint counters for /api/analytics.
+
+Aggregates plug into :class:`storage.complaint_log.ComplaintLog`, which calls
+``apply(old, new)`` for every insert (old is None), update, and delete (new is
+None). The log persists them next to its snapshot via ``to_dict`` /
+``load_dict``, so a restart does not have to recount every complaint.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Mapping, Optional
+
+# Key under which complaints without a value for a field are counted
+MISSING_LABEL = 'Other'
+
+
+def label(value: Any) -> str:
+    """The counter key for a field value; shared by every aggregate so they agree."""
+    if value is None:
+        return MISSING_LABEL
+    return value if isinstance(value, str) else str(value)
+
+
+class ComplaintCounters:
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything; the log calls this before a full recount."""
+        self.total = 0
+        self.status: Counter = Counter()
+        self.category: Counter = Counter()
+
+    def _count(self, complaint: Mapping[str, Any], delta: int) -> None:
+        self.total += delta
+        for counter, key in ((self.status, complaint.get('status')),
+                             (self.category, complaint.get('category'))):
+            key = label(key)
+            counter[key] += delta
+            if not counter[key]:
+                del counter[key]
+
+    def apply(self, old: Optional[Mapping[str, Any]], new: Optional[Mapping[str, Any]]) -> None:
+        """Move one complaint from its old state to its new one."""
+        if old is not None:
+            self._count(old, -1)
+        if new is not None:
+            self._count(new, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'total': self.total, 'status': dict(self.status), 'category': dict(self.category)}
+
+    def load_dict(self, data: Mapping[str, Any]) -> None:
+        self.total = data['total']
+        self.status = Counter(data['status'])
+        self.category = Counter(data['category'])
+
+    def summary(self) -> Dict[str, Any]:
+        """The /api/analytics payload."""
+        return {
+            'total_complaints': self.total,
+            'resolved_count': self.status.get('resolved', 0),
+            'pending_count': self.status.get('pending', 0),
+            'category_distribution': dict(self.category),
+        }
@@ -0,0 +1,157 @@
+"""Group commit for complaint writes.
+
+Concurrent submissions that arrive within ``max_delay_ms`` of each other are
+written as one batch. The first request thread in becomes the leader: it
+writes everyone's records in a single call and wakes the others once the
+batch is durable. A leader that finds itself alone waits briefly for company
+only while writes are arriving concurrently (the previous batch held more
+than one record); a lone writer on an idle committer is never delayed. No thread runs in the
+background, which keeps the committer safe to create before gunicorn forks.
+
+Durability policies:
+
+* ``batch``    - fsync every batch before acknowledging it (the default).
+* ``interval`` - acknowledge after the write; fsync at most every
+  ``fsync_interval`` seconds, so a crash can lose that much. A write that
+  is not fsynced itself starts a one-shot timer that fsyncs it once the
+  interval is up, so the last writes before an idle period are covered too.
+* ``none``     - never fsync; the OS flushes when it likes.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+DURABILITY_MODES = ('batch', 'interval', 'none')
+
+COMMIT_DELAY_MS = float(os.getenv('COMPLAINT_COMMIT_DELAY_MS', '2'))
+COMMIT_MAX_BATCH = int(os.getenv('COMPLAINT_COMMIT_MAX_BATCH', '256'))
+DURABILITY = os.getenv('COMPLAINT_DURABILITY', 'batch').lower()
+FSYNC_INTERVAL = float(os.getenv('COMPLAINT_FSYNC_INTERVAL', '1.0'))
+
+
+class GroupCommitter:
+    def __init__(self, write_batch: Callable[[Sequence[Any], bool], None],
+                 max_delay_ms: float = COMMIT_DELAY_MS, max_batch: int = COMMIT_MAX_BATCH,
+                 durability: str = DURABILITY, fsync_interval: float = FSYNC_INTERVAL):
+        """``write_batch(items, fsync)`` must persist all items in one write.
+
+        ``write_batch([], True)`` must fsync what was written before; the
+        ``interval`` policy calls it when writes go idle.
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {', '.join(DURABILITY_MODES)}")
+        self.write_batch = write_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_batch = max_batch
+        self.durability = durability
+        self.fsync_interval = fsync_interval
+
+        self._cond = threading.Condition()
+        self._pending: List[Dict[str, Any]] = []
+        self._leader_active = False
+        # Records in the last batch written; more than one means concurrent writers
+        self._last_batch_size = 0
+        self._last_fsync = time.monotonic()
+        # Written but not yet fsynced ('interval'), and the timer that will fsync it
+        self._dirty = False
+        self._flush_timer = None
+        # A timer started before a fork does not exist in the child
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        self._cond = threading.Condition()
+        self._leader_active = False
+        self._flush_timer = None
+
+    def submit(self, item: Any) -> None:
+        """Queue one item and return once its batch is written under the policy.
+
+        Re-raises the error if writing the batch failed.
+        """
+        ticket = {'item': item, 'done': False, 'error': None}
+        with self._cond:
+            self._pending.append(ticket)
+        while True:
+            with self._cond:
+                while self._leader_active and not ticket['done']:
+                    self._cond.wait()
+                if ticket['done']:
+                    break
+                self._leader_active = True
+                # Alone right now: wait for others only if they have been writing too.
+                wait = len(self._pending) == 1 and self._last_batch_size > 1
+            # A full queue can leave this ticket out of the batch it leads; lead again.
+            self._lead(wait_for_company=wait)
+        if ticket['error'] is not None:
+            raise ticket['error']
+
+    def _lead(self, wait_for_company: bool) -> None:
+        """Write one batch as the leader, then hand over to the next waiter."""
+        batch: List[Dict[str, Any]] = []
+        error = None
+        try:
+            if wait_for_company and self.max_delay > 0:
+                time.sleep(self.max_delay)
+            with self._cond:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:len(batch)]
+                self._last_batch_size = len(batch)
+            fsync = self._should_fsync()
+            self.write_batch([ticket['item'] for ticket in batch], fsync)
+            if self.durability == 'interval':
+                self._dirty = not fsync
+                if self._dirty:
+                    self._schedule_flush()
+        except Exception as e:
+            error = e
+        finally:
+            with self._cond:
+                for ticket in batch:
+                    ticket['done'] = True
+                    ticket['error'] = error
+                self._leader_active = False
+                # Anyone still pending (queued during the write) elects a new leader.
+                self._cond.notify_all()
+
+    def _schedule_flush(self) -> None:
+        with self._cond:
+            if self._flush_timer is None:
+                delay = max(0.0, self._last_fsync + self.fsync_interval - time.monotonic())
+                self._flush_timer = threading.Timer(delay, self._flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _flush(self) -> None:
+        """Timer callback: fsync writes that no later batch has fsynced."""
+        with self._cond:
+            self._flush_timer = None
+            # Take the leader's place, so no batch is written meanwhile
+            while self._leader_active:
+                self._cond.wait()
+            if not self._dirty:
+                return
+            self._leader_active = True
+        try:
+            self.write_batch([], True)
+            self._last_fsync = time.monotonic()
+            self._dirty = False
+        except Exception:
+            logging.exception("Background fsync of the complaint log failed")
+            # The next write tries again
+        finally:
+            with self._cond:
+                self._leader_active = False
+                self._cond.notify_all()
+
+    def _should_fsync(self) -> bool:
+        if self.durability == 'batch':
+            return True
+        if self.durability == 'interval':
+            now = time.monotonic()
+            if now - self._last_fsync >= self.fsync_interval:
+                self._last_fsync = now
+                return True
+        return False
@@ -0,0 +1,185 @@
+"""Persistent complaint id -> (domain, offset, length) index.
+
+Domain files are JSON arrays, so each complaint occupies one contiguous byte
+span of its file. The index remembers that span, which lets a single
+complaint be read with one seek instead of parsing the whole domain file.
+Each domain has its own index file recording the domain file's (mtime, size),
+so an index that another process has not caught up with, or a file edited by
+hand, is detected and rebuilt.
+"""
+
+import json
+import logging
+import os
+from typing import IO, Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from storage.locking import atomic_write
+from storage.serialization import dumps, load_file, loads
+
+Span = Tuple[int, int]
+
+
+def dump_records(records: Iterable[Dict[str, Any]]) -> Tuple[bytes, List[Span]]:
+    """Serialize records as a JSON array with one compact record per line.
+
+    Returns the encoded file body together with the byte span of every record.
+    """
+    parts = [b'[']
+    spans = []
+    pos = 1
+    for i, record in enumerate(records):
+        sep = b'\n' if i == 0 else b',\n'
+        chunk = dumps(record)
+        parts.append(sep)
+        pos += len(sep)
+        spans.append((pos, len(chunk)))
+        parts.append(chunk)
+        pos += len(chunk)
+    parts.append(b'\n]' if spans else b']')
+    return b''.join(parts), spans
+
+
+def scan_spans(data: bytes) -> List[Tuple[Any, Span]]:
+    """Return (id, span) for every record of an arbitrarily formatted JSON array."""
+    # latin-1 maps every byte to one character, so string offsets are byte offsets.
+    text = data.decode('latin-1')
+    decoder = json.JSONDecoder()
+    results = []
+    pos = text.index('[') + 1
+    while True:
+        while pos < len(text) and text[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(text) or text[pos] == ']':
+            return results
+        record, end = decoder.raw_decode(text, pos)
+        results.append((record.get('id') if isinstance(record, dict) else None, (pos, end - pos)))
+        pos = end
+
+
+def iter_json_array(f: IO[str], chunk_size: int = 64 * 1024) -> Iterator[Dict[str, Any]]:
+    """Yield the objects of a JSON array file one at a time, in bounded memory."""
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    while True:
+        # Between records there is only the opening bracket, commas and whitespace.
+        while pos < len(buf) and buf[pos] in '[, \t\r\n':
+            pos += 1
+        if pos < len(buf) and buf[pos] == ']':
+            return
+        if pos < len(buf):
+            try:
+                # Records are objects, so a successful decode is never a truncated value.
+                record, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield record
+                continue
+        if eof:
+            return
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+def read_span(filepath: str, span: Span) -> Optional[Dict[str, Any]]:
+    """Read and decode the record stored at ``span`` of ``filepath``."""
+    offset, length = span
+    try:
+        with open(filepath, 'rb') as f:
+            f.seek(offset)
+            return loads(f.read(length))
+    except (OSError, ValueError):
+        return None
+
+
+def _signature(st: os.stat_result) -> List[int]:
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+
+def _file_signature(filepath: str) -> Optional[List[int]]:
+    try:
+        return _signature(os.stat(filepath))
+    except FileNotFoundError:
+        return None
+
+
+class ComplaintIndex:
+    def __init__(self, data_dir: str, domain_files: Mapping[str, str]):
+        """Load the persisted index, rebuilding any domain whose file has changed."""
+        self.data_dir = data_dir
+        self.domain_files = domain_files
+        self._ids: Dict[str, Dict[str, Span]] = {domain: {} for domain in domain_files}
+        self._signatures: Dict[str, Optional[List[int]]] = {}
+        for domain in domain_files:
+            self._load(domain)
+        self.refresh()
+
+    def _filepath(self, domain: str) -> str:
+        return os.path.join(self.data_dir, self.domain_files[domain])
+
+    def _index_path(self, domain: str) -> str:
+        # One index file per domain, so it shares the domain file's lock.
+        return os.path.join(self.data_dir, f"complaint_index.{domain}.json")
+
+    def _load(self, domain: str) -> None:
+        try:
+            stored = load_file(self._index_path(domain))
+        except (json.JSONDecodeError, FileNotFoundError):
+            return
+        self._signatures[domain] = stored.get('signature')
+        self._ids[domain] = {cid: tuple(span) for cid, span in stored.get('ids', {}).items()}
+
+    def _set_domain(self, domain: str, entries: Iterable[Tuple[Any, Span]],
+                    signature: Optional[List[int]]) -> None:
+        self._ids[domain] = {
+            str(complaint_id): span for complaint_id, span in entries if complaint_id is not None
+        }
+        self._signatures[domain] = signature
+        stored = {'signature': self._signatures[domain], 'ids': self._ids[domain]}
+        atomic_write(self._index_path(domain), dumps(stored), fsync=False)
+
+    def refresh(self) -> None:
+        """Re-scan any domain file whose (mtime, size) no longer matches the index."""
+        for domain in self.domain_files:
+            filepath = self._filepath(domain)
+            if self._signatures.get(domain) == _file_signature(filepath):
+                continue
+            # Another worker may already have re-indexed it; prefer its copy.
+            self._load(domain)
+            if self._signatures.get(domain) == _file_signature(filepath):
+                continue
+            signature = None
+            entries = []
+            try:
+                with open(filepath, 'rb') as f:
+                    # Sign what was actually read, even if the file is replaced meanwhile.
+                    signature = _signature(os.fstat(f.fileno()))
+                    entries = scan_spans(f.read())
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError):
+                logging.warning("Could not index complaints in %s", filepath)
+            self._set_domain(domain, entries, signature)
+
+    def record_write(self, domain: str, records: List[Dict[str, Any]], spans: List[Span]) -> None:
+        """Update the index after ``domain``'s file was rewritten with ``records``.
+
+        Call this while still holding the domain file's lock.
+        """
+        self._set_domain(domain, ((r.get('id'), span) for r, span in zip(records, spans)),
+                         _file_signature(self._filepath(domain)))
+
+    def lookup(self, complaint_id: Any) -> Optional[Tuple[str, Span]]:
+        """Return (filepath, span) for a complaint id, or None if it is unknown."""
+        self.refresh()
+        key = str(complaint_id)
+        for domain, ids in self._ids.items():
+            span = ids.get(key)
+            if span is not None:
+                return self._filepath(domain), span
+        return None
@@ -0,0 +1,180 @@
+"""Filtering, field projection and cursor pagination for complaint listings.
+
+Cursors are opaque to clients. Internally they hold the last record scanned
+(its id and insertion-order number, or the SQLite ``seq``) to resume after, so
+fetching the next page never re-filters the records that earlier pages
+already went past, and a delete or compaction in between skips nothing.
+"""
+
+import base64
+import json
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Exact-match filters (case-insensitive) and the query parameters for the createdAt range
+FILTER_FIELDS = ('status', 'priority', 'domain', 'department', 'category')
+RANGE_PARAMS = {'createdFrom': 'created_from', 'createdTo': 'created_to'}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(position: int, last_id: Any = None) -> str:
+    payload: Dict[str, Any] = {'p': position}
+    if last_id is not None:
+        payload['id'] = str(last_id)
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[int, Optional[str]]:
+    """Decode a cursor produced by encode_cursor into (position, last id).
+
+    Raises ValueError if it is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        position, last_id = payload['p'], payload.get('id')
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if not isinstance(position, int) or position < 0 or not isinstance(last_id, (str, type(None))):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return position, last_id
+
+
+def created_at(complaint: Mapping[str, Any]) -> str:
+    """Creation time of a complaint; older records only carry ``timestamp``."""
+    return complaint.get('createdAt') or complaint.get('timestamp') or ''
+
+
+def field_value(complaint: Mapping[str, Any], field: str) -> Any:
+    """Read a filterable field, accounting for the analyzer's field names."""
+    if field == 'department':
+        return complaint.get('department') or complaint.get('assignedDepartment')
+    return complaint.get(field)
+
+
+def complaint_matches(complaint: Mapping[str, Any], filters: Mapping[str, Any]) -> bool:
+    """Check a complaint against FILTER_FIELDS values and a created_from/created_to range.
+
+    created_from is inclusive and created_to exclusive; both are ISO-8601 strings.
+    """
+    for field in FILTER_FIELDS:
+        wanted = filters.get(field)
+        if wanted is not None and str(field_value(complaint, field) or '').lower() != wanted.lower():
+            return False
+    created_from = filters.get('created_from')
+    created_to = filters.get('created_to')
+    if created_from or created_to:
+        created = created_at(complaint)
+        if created_from and created < created_from:
+            return False
+        if created_to and created >= created_to:
+            return False
+    return True
+
+
+def project(complaint: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Keep only the requested fields (``id`` is always included)."""
+    if not fields:
+        return complaint
+    return {k: complaint[k] for k in ('id', *fields) if k in complaint}
+
+
+def _resume_index(complaints: Sequence[Dict[str, Any]], position: int, last_id: Optional[str],
+                  order: Optional[Callable[[str], Optional[int]]]) -> int:
+    """Index of the first complaint after the one a cursor stopped at."""
+    if order is None:
+        # Positions: the last record normally has not moved; find it if it has.
+        if last_id is not None:
+            if position < len(complaints) and str(complaints[position].get('id')) == last_id:
+                return position + 1
+            for i, complaint in enumerate(complaints):
+                if str(complaint.get('id')) == last_id:
+                    return i + 1
+        return position + 1
+
+    if last_id is not None:
+        current = order(last_id)
+        if current is not None:
+            position = current
+    # Binary search for the first order number past the position. Records
+    # deleted since the listing was read have none; they are stepped over.
+    lo, hi = 0, len(complaints)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        probe, key = mid, None
+        while key is None and probe < hi:
+            key = order(str(complaints[probe].get('id')))
+            probe += 1
+        if key is None or key > position:
+            hi = mid
+        else:
+            lo = probe
+    return lo
+
+
+def select_complaints(
+    complaints: Sequence[Dict[str, Any]],
+    filters: Optional[Mapping[str, Any]] = None,
+    fields: Optional[Sequence[str]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    order: Optional[Callable[[str], Optional[int]]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Filter, project and paginate complaints given in insertion order.
+
+    Returns the page and the cursor for the next one (None on the last page).
+    The cursor holds the id of the last record scanned and its insertion-order
+    number, as given by ``order`` (e.g. :meth:`SecondaryIndex.order`), so
+    records deleted or compacted away between requests never shift the next
+    page. Without ``order`` the record's position is used instead, which is
+    only a fallback for when that id is gone.
+    """
+    filters = filters or {}
+    position = 0
+    if cursor:
+        position = _resume_index(complaints, *decode_cursor(cursor), order)
+    page = []
+    while position < len(complaints):
+        complaint = complaints[position]
+        position += 1
+        if complaint_matches(complaint, filters):
+            page.append(project(complaint, fields))
+            if limit is not None and len(page) >= limit:
+                break
+    if position >= len(complaints):
+        return page, None
+    last_id = str(complaints[position - 1].get('id'))
+    last_order = order(last_id) if order is not None else None
+    return page, encode_cursor(position - 1 if last_order is None else last_order, last_id)
+
+
+def parse_query_args(args: Mapping[str, str]) -> Dict[str, Any]:
+    """Turn request query parameters into select_complaints keyword arguments.
+
+    Raises ValueError for a malformed ``limit`` or ``cursor``.
+    """
+    filters = {field: args[field] for field in FILTER_FIELDS if args.get(field)}
+    for param, key in RANGE_PARAMS.items():
+        if args.get(param):
+            filters[key] = args[param]
+
+    limit = None
+    if args.get('limit'):
+        try:
+            limit = int(args['limit'])
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        limit = min(limit, MAX_PAGE_SIZE)
+
+    cursor = args.get('cursor') or None
+    if cursor:
+        decode_cursor(cursor)
+        if limit is None:
+            limit = DEFAULT_PAGE_SIZE
+
+    fields = [f.strip() for f in args.get('fields', '').split(',') if f.strip()] or None
+    return {'filters': filters, 'fields': fields, 'limit': limit, 'cursor': cursor}
+
@@ -0,0 +1,135 @@
+"""Per-hour and per-day complaint rollups for trend analytics.
+
+An aggregate for :class:`storage.complaint_log.ComplaintLog` (same interface
+as :class:`storage.counters.ComplaintCounters`). Every complaint is counted in
+the hour and the day of its ``createdAt`` (or ``timestamp``), broken down by
+category, priority, department and status, so /api/analytics/timeseries reads
+pre-aggregated buckets instead of scanning complaints.
+
+Daily buckets are kept forever. Hourly buckets older than the retention window
+are dropped, since the daily buckets already hold the same counts; that
+happens when a new hourly bucket is started and when a series is read, never
+as a side effect of persisting the rollups.
+"""
+
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional
+
+from storage.counters import label
+
+HOURLY_RETENTION_DAYS = int(os.getenv('ROLLUP_HOURLY_RETENTION_DAYS', '14'))
+
+DIMENSIONS = ('category', 'priority', 'department', 'status')
+BUCKET_SIZES = ('hour', 'day')
+
+_TIMESTAMP = re.compile(r'^(\d{4}-\d{2}-\d{2})(?:[T ](\d{2}))?')
+
+
+def _bucket_keys(complaint: Mapping[str, Any]):
+    """Return the (hour, day) bucket keys of a complaint, or None if it has no date."""
+    match = _TIMESTAMP.match(complaint.get('createdAt') or complaint.get('timestamp') or '')
+    if not match:
+        return None
+    day, hour = match.groups()
+    return (f"{day}T{hour}" if hour else None), day
+
+
+def _new_bucket() -> Dict[str, Any]:
+    bucket = {'total': 0}
+    bucket.update({dimension: Counter() for dimension in DIMENSIONS})
+    return bucket
+
+
+class TimeRollups:
+    def __init__(self, hourly_retention_days: int = HOURLY_RETENTION_DAYS):
+        self.hourly_retention_days = hourly_retention_days
+        self.reset()
+
+    def reset(self) -> None:
+        self.buckets: Dict[str, Dict[str, Dict[str, Any]]] = {size: {} for size in BUCKET_SIZES}
+
+    def _hourly_cutoff(self) -> str:
+        cutoff = datetime.utcnow() - timedelta(days=self.hourly_retention_days)
+        return cutoff.strftime('%Y-%m-%dT%H')
+
+    def _count(self, size: str, key: str, complaint: Mapping[str, Any], delta: int) -> None:
+        buckets = self.buckets[size]
+        bucket = buckets.get(key)
+        if bucket is None:
+            if delta < 0 or (size == 'hour' and key < self._hourly_cutoff()):
+                # Already compacted away (or never kept): nothing to adjust.
+                return
+            if size == 'hour':
+                # A new hour is the write that can push old ones out of the window.
+                self.compact()
+            bucket = buckets[key] = _new_bucket()
+        bucket['total'] += delta
+        for dimension in DIMENSIONS:
+            value = complaint.get(dimension)
+            if dimension == 'department' and not value:
+                value = complaint.get('assignedDepartment')
+            value = label(value)
+            counter = bucket[dimension]
+            counter[value] += delta
+            if not counter[value]:
+                del counter[value]
+        if not bucket['total']:
+            del buckets[key]
+
+    def _add(self, complaint: Mapping[str, Any], delta: int) -> None:
+        keys = _bucket_keys(complaint)
+        if keys is None:
+            return
+        hour, day = keys
+        if hour:
+            self._count('hour', hour, complaint, delta)
+        self._count('day', day, complaint, delta)
+
+    def apply(self, old: Optional[Mapping[str, Any]], new: Optional[Mapping[str, Any]]) -> None:
+        """Move one complaint from its old state to its new one."""
+        if old is not None:
+            self._add(old, -1)
+        if new is not None:
+            self._add(new, 1)
+
+    def compact(self) -> None:
+        """Drop hourly buckets that fell out of the retention window."""
+        cutoff = self._hourly_cutoff()
+        hourly = self.buckets['hour']
+        for key in [key for key in hourly if key < cutoff]:
+            del hourly[key]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {size: {key: {k: (dict(v) if isinstance(v, Counter) else v) for k, v in bucket.items()}
+                       for key, bucket in buckets.items()}
+                for size, buckets in self.buckets.items()}
+
+    def load_dict(self, data: Mapping[str, Any]) -> None:
+        self.reset()
+        for size in BUCKET_SIZES:
+            for key, stored in data.get(size, {}).items():
+                bucket = _new_bucket()
+                bucket['total'] = stored['total']
+                for dimension in DIMENSIONS:
+                    bucket[dimension].update(stored.get(dimension, {}))
+                self.buckets[size][key] = bucket
+
+    def series(self, bucket: str = 'day', start: Optional[str] = None,
+               end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Buckets of one size in time order; ``start`` is inclusive, ``end`` exclusive."""
+        if bucket not in BUCKET_SIZES:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKET_SIZES)}")
+        self.compact()
+        buckets = self.buckets[bucket]
+        if start:
+            # A bucket that contains ``start`` is included.
+            start = start[:len('YYYY-MM-DDTHH') if bucket == 'hour' else len('YYYY-MM-DD')]
+        return [
+            {'bucket': key, 'total': buckets[key]['total'],
+             **{dimension: dict(buckets[key][dimension]) for dimension in DIMENSIONS}}
+            for key in sorted(buckets)
+            if (not start or key >= start) and (not end or key < end)
+        ]
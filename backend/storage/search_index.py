@@ -0,0 +1,243 @@
+"""Inverted full-text index over complaint titles and descriptions.
+
+Text is tokenized like the TF-IDF pipelines in
+``sbackend/camplaint-analyzer/train.py`` (lowercasing, ``\\b\\w\\w+\\b`` tokens,
+English stop words from :mod:`storage.stop_words` removed), restricted to
+unigrams, without importing scikit-learn. Matches are ranked with
+BM25. A query term ending in ``*`` matches every indexed term with that
+prefix; prefixes are found by bisecting a sorted list of the vocabulary.
+
+A term's BM25 score in a document depends only on the term frequency and
+the document length, so the postings of a queried term are also grouped by
+that pair ("impact buckets") and read best score first.
+:meth:`SearchIndex.lookup` stops reading once no unread document can beat
+the current ``limit``-th result (the threshold algorithm, skipping terms
+MaxScore-style once they alone cannot reach it), so a query on a common
+term reads a few buckets instead of every posting. The results are exactly
+those of scoring every matching document.
+
+The index is attached to :class:`storage.complaint_log.ComplaintLog` via its
+``indexes`` argument, which keeps it in step with creates, updates and
+deletes and persists it next to the snapshot.
+"""
+
+import heapq
+import itertools
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+from storage.stop_words import ENGLISH_STOP_WORDS
+
+# Fields that make up a complaint's searchable text
+SEARCH_FIELDS = ('title', 'description')
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# A prefix term expands to at most this many indexed terms
+MAX_PREFIX_EXPANSIONS = 50
+
+# Postings scored between checks of the stopping condition
+_READ_CHUNK = 256
+
+_WORD = re.compile(r'(?u)\b\w\w+\b')
+_TOKEN = re.compile(r'\S+')
+
+
+def _analyze(text: str) -> List[str]:
+    """Unigrams as TfidfVectorizer(stop_words='english') would produce them."""
+    return [word for word in _WORD.findall(text.lower()) if word not in ENGLISH_STOP_WORDS]
+
+
+def _document_text(complaint: Mapping[str, Any]) -> str:
+    return ' '.join(str(complaint.get(field) or '') for field in SEARCH_FIELDS)
+
+
+class SearchIndex:
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        # term -> {id: term frequency}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # id -> number of tokens in the document
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+        # Sorted vocabulary for prefix lookups, built on first use
+        self._terms: Optional[List[str]] = None
+        # term -> {(term frequency, document length): ids}, built when first queried
+        self._impacts: Dict[str, Dict[Tuple[int, int], Set[str]]] = {}
+
+    def apply(self, old: Optional[Mapping[str, Any]], new: Optional[Mapping[str, Any]]) -> None:
+        """Move one complaint from its old state to its new one."""
+        if old is not None and new is not None and all(
+                old.get(field) == new.get(field) for field in SEARCH_FIELDS):
+            # Only non-text fields changed (e.g. status).
+            return
+        if old is not None:
+            self._remove(str(old.get('id')), _analyze(_document_text(old)))
+        if new is not None:
+            self._add(str(new.get('id')), _analyze(_document_text(new)))
+
+    def _add(self, key: str, tokens: List[str]) -> None:
+        self._lengths[key] = len(tokens)
+        self._total_length += len(tokens)
+        for term, frequency in Counter(tokens).items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                if self._terms is not None:
+                    insort(self._terms, term)
+            postings[key] = frequency
+            buckets = self._impacts.get(term)
+            if buckets is not None:
+                buckets.setdefault((frequency, len(tokens)), set()).add(key)
+
+    def _remove(self, key: str, tokens: List[str]) -> None:
+        # Re-analyzing the old text finds the document's postings without
+        # keeping a forward index.
+        length = self._lengths.pop(key, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in set(tokens):
+            postings = self._postings.get(term)
+            if postings is None or key not in postings:
+                continue
+            frequency = postings.pop(key)
+            buckets = self._impacts.get(term)
+            if buckets is not None:
+                ids = buckets[frequency, length]
+                ids.discard(key)
+                if not ids:
+                    del buckets[frequency, length]
+            if not postings:
+                del self._postings[term]
+                self._impacts.pop(term, None)
+                if self._terms is not None:
+                    del self._terms[bisect_left(self._terms, term)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'postings': self._postings, 'lengths': self._lengths}
+
+    def load_dict(self, data: Mapping[str, Any]) -> None:
+        self.reset()
+        self._postings = {term: dict(postings) for term, postings in data['postings'].items()}
+        self._lengths = dict(data['lengths'])
+        self._total_length = sum(self._lengths.values())
+
+    def _expand(self, prefix: str) -> List[str]:
+        if self._terms is None:
+            self._terms = sorted(self._postings)
+        start = bisect_left(self._terms, prefix)
+        expansions = []
+        for term in self._terms[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            expansions.append(term)
+        return expansions
+
+    def _query_terms(self, query: str) -> List[List[str]]:
+        """Group the query into alternatives: one term, or a prefix's expansions."""
+        groups = []
+        for word in _TOKEN.findall(query):
+            if word.endswith('*'):
+                # Prefixes skip the stop-word list: "inter*" must still match.
+                for prefix in re.findall(r'(?u)\w+', word.lower()):
+                    groups.append(self._expand(prefix))
+            else:
+                groups.extend([term] for term in _analyze(word))
+        return groups
+
+    def _impact_buckets(self, term: str) -> Dict[Tuple[int, int], Set[str]]:
+        buckets = self._impacts.get(term)
+        if buckets is None:
+            buckets = self._impacts[term] = {}
+            for key, frequency in self._postings[term].items():
+                buckets.setdefault((frequency, self._lengths[key]), set()).add(key)
+        return buckets
+
+    def lookup(self, query: str, limit: int = 20) -> List[str]:
+        """Ids of the best BM25 matches for ``query``, best first."""
+        if not self._lengths or limit < 1:
+            return []
+        count = len(self._lengths)
+        average_length = self._total_length / count
+        # Per query group: (term, postings, idf) of each of its terms in the index
+        groups = []
+        for group in self._query_terms(query):
+            terms = []
+            for term in group:
+                postings = self._postings.get(term)
+                if postings:
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    terms.append((term, postings, idf))
+            if terms:
+                groups.append(terms)
+        if not groups:
+            return []
+
+        def score(key: str) -> float:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[key] / average_length)
+            total = 0.0
+            for terms in groups:
+                # A document matching several expansions of one prefix counts once.
+                best = 0.0
+                for _, postings, idf in terms:
+                    frequency = postings.get(key)
+                    if frequency:
+                        best = max(best, idf * frequency * (BM25_K1 + 1) / (frequency + norm))
+                total += best
+            return total
+
+        # Every group's impact buckets as (score, ids), best first
+        buckets = []
+        for terms in groups:
+            scored = []
+            for term, _, idf in terms:
+                for (frequency, length), ids in self._impact_buckets(term).items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scored.append((idf * frequency * (BM25_K1 + 1) / (frequency + norm), ids))
+            scored.sort(key=lambda bucket: bucket[0], reverse=True)
+            buckets.append(scored)
+        positions = [0] * len(groups)
+        unread = [None] * len(groups)
+
+        top: List[Tuple[float, str]] = []
+        seen: Set[str] = set()
+        while True:
+            # No unread document scores more in a group than its current bucket.
+            bounds = [scored[position][0] if position < len(scored) else 0.0
+                      for scored, position in zip(buckets, positions)]
+            threshold = top[0][0] if len(top) == limit else 0.0
+            # Groups whose bounds add up to no more than the threshold cannot
+            # bring in a new result on their own, so only the others are read.
+            essential = []
+            total = 0.0
+            for g in sorted(range(len(groups)), key=bounds.__getitem__):
+                total += bounds[g]
+                if bounds[g] and (len(top) < limit or total > threshold):
+                    essential.append(g)
+            if not essential:
+                break
+            g = max(essential, key=bounds.__getitem__)
+            if unread[g] is None:
+                unread[g] = iter(buckets[g][positions[g]][1])
+            chunk = list(itertools.islice(unread[g], _READ_CHUNK))
+            if len(chunk) < _READ_CHUNK:
+                positions[g] += 1
+                unread[g] = None
+            for key in chunk:
+                if key in seen:
+                    continue
+                seen.add(key)
+                entry = (score(key), key)
+                if len(top) < limit:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+        return [key for _, key in sorted(top, reverse=True)]
@@ -0,0 +1,93 @@
+"""In-memory secondary indexes for triage queries.
+
+Keeps, for status, priority and department, the set of complaint ids per
+(lowercased) value, so "High-priority pending complaints for IT" is an
+intersection of three id sets instead of a scan of every complaint. The
+index is attached to :class:`storage.complaint_log.ComplaintLog` via its
+``indexes`` argument and follows the cached state through inserts, PATCHes
+and deletes.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set
+
+from storage.query import field_value
+
+INDEXED_FIELDS = ('status', 'priority', 'department')
+
+
+class SecondaryIndex:
+    def __init__(self, fields: Sequence[str] = INDEXED_FIELDS):
+        self.fields = tuple(fields)
+        self.reset()
+
+    def reset(self) -> None:
+        self._postings: Dict[str, Dict[str, Set[str]]] = {field: {} for field in self.fields}
+        # Insertion order of every id, so results come back in log order
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+
+    @staticmethod
+    def _value(complaint: Mapping[str, Any], field: str) -> str:
+        # Same normalization as storage.query.complaint_matches
+        return str(field_value(complaint, field) or '').lower()
+
+    def apply(self, old: Optional[Mapping[str, Any]], new: Optional[Mapping[str, Any]]) -> None:
+        """Move one complaint from its old state to its new one."""
+        key = str((new if new is not None else old).get('id'))
+        for field in self.fields:
+            postings = self._postings[field]
+            old_value = self._value(old, field) if old is not None else None
+            new_value = self._value(new, field) if new is not None else None
+            if old_value == new_value:
+                continue
+            if old_value is not None:
+                ids = postings.get(old_value)
+                if ids is not None:
+                    ids.discard(key)
+                    if not ids:
+                        del postings[old_value]
+            if new_value is not None:
+                postings.setdefault(new_value, set()).add(key)
+        if new is None:
+            self._order.pop(key, None)
+        elif key not in self._order:
+            self._order[key] = self._next_order
+            self._next_order += 1
+
+    def order(self, complaint_id: str) -> Optional[int]:
+        """Insertion-order number of a complaint, or None if it is not indexed."""
+        return self._order.get(complaint_id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'postings': {field: {value: sorted(ids) for value, ids in postings.items()}
+                         for field, postings in self._postings.items()},
+            'order': self._order,
+            'next_order': self._next_order,
+        }
+
+    def load_dict(self, data: Mapping[str, Any]) -> None:
+        self.reset()
+        for field in self.fields:
+            self._postings[field] = {
+                value: set(ids) for value, ids in data['postings'].get(field, {}).items()
+            }
+        self._order = dict(data['order'])
+        self._next_order = data['next_order']
+
+    def lookup(self, filters: Mapping[str, Any]) -> Optional[List[str]]:
+        """Ids matching every indexed filter, in insertion order.
+
+        Returns None when no indexed field is filtered on; other filters are
+        left to the caller.
+        """
+        id_sets = [
+            self._postings[field].get(str(filters[field]).lower(), set())
+            for field in self.fields if filters.get(field)
+        ]
+        if not id_sets:
+            return None
+        # Intersecting from the smallest set keeps the work proportional to the result.
+        id_sets.sort(key=len)
+        matches = id_sets[0].intersection(*id_sets[1:])
+        return sorted(matches, key=self._order.__getitem__)
@@ -0,0 +1,262 @@
+"""SQLite storage engine for complaints.
+
+Implements the same ``get_complaints`` / ``save_complaint`` /
+``get_complaint_by_id`` API as :class:`complaint_manager.ComplaintManager`, so
+it can be dropped in behind ``complaint_manager.complaint_manager``. The
+database runs in WAL mode so readers are never blocked by a writer, and the
+columns the API filters on are indexed.
+
+Run ``python -m storage.sqlite_store migrate`` from ``backend/`` to import the
+existing ``*_complaints.json`` files once.
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from storage.query import (
+    DEFAULT_PAGE_SIZE, complaint_matches, created_at, decode_cursor, encode_cursor, project,
+)
+from storage.sequence import format_id, id_number, id_prefix
+from storage.serialization import JSONDecodeError, dumps_str, load_file, loads
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS complaints (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    domain TEXT NOT NULL,
+    status TEXT,
+    priority TEXT,
+    created_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_complaints_domain ON complaints (domain, seq);
+CREATE INDEX IF NOT EXISTS idx_complaints_status ON complaints (status);
+CREATE INDEX IF NOT EXISTS idx_complaints_priority ON complaints (priority);
+CREATE INDEX IF NOT EXISTS idx_complaints_created_at ON complaints (created_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS sequences (
+    prefix TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class SQLiteComplaintStore:
+    def __init__(self, db_path: str, domain_files: Mapping[str, str]):
+        """Open (and if needed create) the complaint database at ``db_path``."""
+        self.db_path = db_path
+        self.domain_files = domain_files
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection; sqlite3 connections are not shared."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _domain_key(self, domain: str) -> str:
+        """Map a domain onto its storage bucket, like ComplaintManager's file lookup."""
+        domain = (domain or 'default').lower()
+        return domain if domain in self.domain_files else 'default'
+
+    @staticmethod
+    def _lower(value):
+        return value.lower() if isinstance(value, str) else value
+
+    @classmethod
+    def _row_values(cls, complaint: Dict, domain_key: str) -> tuple:
+        # status and priority are stored lowercased so filters can use the indexes
+        return (
+            str(complaint['id']),
+            domain_key,
+            cls._lower(complaint.get('status')),
+            cls._lower(complaint.get('priority')),
+            created_at(complaint) or None,
+            dumps_str(complaint),
+        )
+
+    def get_complaints(self, domain: Optional[str] = None,
+                       fields: Optional[Sequence[str]] = None, **filters) -> List[Dict]:
+        """Get all complaints, optionally filtered by domain and storage.query filters."""
+        complaints, _ = self.get_complaints_page(domain, None, None, fields, **filters)
+        return complaints
+
+    def get_complaints_page(self, domain: Optional[str] = None,
+                            limit: Optional[int] = DEFAULT_PAGE_SIZE,
+                            cursor: Optional[str] = None, fields: Optional[Sequence[str]] = None,
+                            **filters) -> Tuple[List[Dict], Optional[str]]:
+        """Return one page of complaints and the cursor for the next page.
+
+        domain, status, priority and the createdAt range are answered by the
+        indexes; department and category are checked on the decoded rows.
+        """
+        where, params = [], []
+        if domain:
+            where.append('domain = ?')
+            params.append(self._domain_key(domain))
+        for column in ('status', 'priority'):
+            if filters.get(column):
+                where.append(f'{column} = ?')
+                params.append(filters[column].lower())
+        if filters.get('created_from'):
+            where.append('created_at >= ?')
+            params.append(filters['created_from'])
+        if filters.get('created_to'):
+            where.append('created_at < ?')
+            params.append(filters['created_to'])
+        if cursor:
+            where.append('seq > ?')
+            params.append(decode_cursor(cursor)[0])
+        sql = 'SELECT seq, data FROM complaints'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY seq'
+
+        # The remaining filters only look at fields SQLite does not index.
+        residual = {k: v for k, v in filters.items() if k in ('department', 'category')}
+        page = []
+        for seq, data in self._connection().execute(sql, params):
+            complaint = loads(data)
+            if residual and not complaint_matches(complaint, residual):
+                continue
+            page.append(project(complaint, fields))
+            if limit is not None and len(page) >= limit:
+                return page, encode_cursor(seq)
+        return page, None
+
+    def iter_complaints(self, domain: Optional[str] = None,
+                        include_archived: bool = False) -> Iterator[Dict]:
+        """Yield complaints straight off a database cursor.
+
+        This store never archives, so every complaint is in the table and
+        ``include_archived`` (accepted like the JSON store's) changes nothing.
+        """
+        conn = self._connection()
+        if domain:
+            cursor = conn.execute(
+                'SELECT data FROM complaints WHERE domain = ? ORDER BY seq', (self._domain_key(domain),)
+            )
+        else:
+            cursor = conn.execute('SELECT data FROM complaints ORDER BY seq')
+        while True:
+            rows = cursor.fetchmany(500)
+            if not rows:
+                return
+            for (data,) in rows:
+                yield loads(data)
+
+    @staticmethod
+    def _reserve_numbers(conn: sqlite3.Connection, prefix: str, count: int) -> range:
+        """Advance a prefix's sequence inside the caller's write transaction."""
+        row = conn.execute('SELECT value FROM sequences WHERE prefix = ?', (prefix,)).fetchone()
+        if row is None:
+            # First use: continue after the highest id already stored (e.g. migrated).
+            last = max((id_number(cid, prefix) or 0 for (cid,) in conn.execute(
+                'SELECT id FROM complaints WHERE id LIKE ?', (f"{prefix}-%",)
+            )), default=0)
+        else:
+            (last,) = row
+        conn.execute(
+            'INSERT OR REPLACE INTO sequences (prefix, value) VALUES (?, ?)', (prefix, last + count)
+        )
+        return range(last + 1, last + count + 1)
+
+    def reserve_ids(self, domain: str, count: int = 1) -> List[str]:
+        """Reserve a block of unique ids for complaints of a domain."""
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        prefix = id_prefix(domain)
+        with self._connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            numbers = self._reserve_numbers(conn, prefix, count)
+        return [format_id(prefix, number) for number in numbers]
+
+    def save_complaint(self, complaint_data: Dict, domain: str = 'default') -> Dict:
+        """Save a new complaint under the given domain."""
+        if 'domain' in complaint_data:
+            domain = complaint_data['domain']
+        return self.save_complaints([complaint_data], domain)[0]
+
+    def save_complaints(self, complaints_data: List[Dict], domain: str = 'default') -> List[Dict]:
+        """Save several new complaints of one domain in a single transaction."""
+        if not complaints_data:
+            return []
+        domain_key = self._domain_key(domain)
+        prefix = id_prefix(domain)
+        timestamp = datetime.now().isoformat()
+
+        with self._connection() as conn:
+            # The ids and the rows are committed together, so neither can be lost alone.
+            conn.execute('BEGIN IMMEDIATE')
+            numbers = self._reserve_numbers(conn, prefix, len(complaints_data))
+            complaints = [
+                {
+                    "id": format_id(prefix, number),
+                    "domain": domain,
+                    "timestamp": timestamp,
+                    **{k: v for k, v in complaint_data.items() if k != 'domain'}
+                }
+                for number, complaint_data in zip(numbers, complaints_data)
+            ]
+            conn.executemany(
+                'INSERT INTO complaints (id, domain, status, priority, created_at, data) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (self._row_values(complaint, domain_key) for complaint in complaints),
+            )
+        return complaints
+
+    def get_complaint_by_id(self, complaint_id: str) -> Optional[Dict]:
+        """Get a specific complaint by its ID."""
+        row = self._connection().execute(
+            'SELECT data FROM complaints WHERE id = ?', (str(complaint_id),)
+        ).fetchone()
+        return loads(row[0]) if row else None
+
+    def migrate_json_files(self, data_dir: str) -> int:
+        """Import the per-domain JSON files once; later calls are no-ops."""
+        with self._connection() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                return 0
+            imported = 0
+            for domain_key, filename in self.domain_files.items():
+                filepath = os.path.join(data_dir, filename)
+                try:
+                    complaints = load_file(filepath)
+                except (JSONDecodeError, FileNotFoundError):
+                    continue
+                cursor = conn.executemany(
+                    'INSERT OR IGNORE INTO complaints '
+                    '(id, domain, status, priority, created_at, data) VALUES (?, ?, ?, ?, ?, ?)',
+                    (self._row_values(c, domain_key) for c in complaints if 'id' in c),
+                )
+                imported += cursor.rowcount
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('json_migrated', ?)",
+                (datetime.now().isoformat(),),
+            )
+        logging.info("Migrated %d complaints from %s into %s", imported, data_dir, self.db_path)
+        return imported
+
+
+if __name__ == '__main__':
+    from complaint_manager import DATA_DIR, DOMAIN_FILES, SQLITE_PATH
+
+    if sys.argv[1:] != ['migrate']:
+        sys.exit("usage: python -m storage.sqlite_store migrate")
+    store = SQLiteComplaintStore(SQLITE_PATH, DOMAIN_FILES)
+    print(f"Imported {store.migrate_json_files(DATA_DIR)} complaints into {SQLITE_PATH}")
@@ -0,0 +1,165 @@
+"""Checks for storage.complaint_log.ComplaintLog: replay, compaction and recovery.
+
+Runs under pytest or directly (from ``backend/``):
+
+    python test_complaint_log.py
+"""
+
+import json
+import os
+import tempfile
+
+from storage.complaint_log import ComplaintLog
+from storage.counters import ComplaintCounters
+from storage.secondary_index import SecondaryIndex
+
+
+def open_log(directory, **kwargs):
+    """A log like the API's, with counters and the field index attached."""
+    return ComplaintLog(os.path.join(directory, 'complaints.json'),
+                        aggregates={'counters': ComplaintCounters()},
+                        indexes={'fields': SecondaryIndex()}, **kwargs)
+
+
+def complaint(number, status='pending', category='IT'):
+    return {'id': f'C{number}', 'title': f'complaint {number}', 'status': status,
+            'category': category, 'priority': 'High', 'department': 'IT'}
+
+
+def write_history(log):
+    """Puts, a patch and a delete; returns the expected complaints by id."""
+    for number in range(5):
+        log.append(complaint(number))
+    log.update('C1', {'status': 'resolved'})
+    log.delete('C3')
+    return {'C0': complaint(0), 'C1': {**complaint(1), 'status': 'resolved'},
+            'C2': complaint(2), 'C4': complaint(4)}
+
+
+def by_id(complaints):
+    return {c['id']: c for c in complaints}
+
+
+def test_replay_rebuilds_the_state_from_the_log():
+    with tempfile.TemporaryDirectory() as directory:
+        expected = write_history(open_log(directory))
+        assert by_id(open_log(directory).load()) == expected
+
+
+def test_replay_picks_up_other_writers():
+    with tempfile.TemporaryDirectory() as directory:
+        reader, writer = open_log(directory), open_log(directory)
+        reader.append(complaint(0))
+        assert len(reader.load()) == 1
+        writer.append(complaint(1))
+        writer.update('C0', {'status': 'resolved'})
+        # Only the new tail is replayed, on the reader's next read.
+        assert by_id(reader.load()) == {'C0': {**complaint(0), 'status': 'resolved'},
+                                        'C1': complaint(1)}
+
+
+def test_replay_skips_a_torn_last_line():
+    with tempfile.TemporaryDirectory() as directory:
+        log = open_log(directory)
+        log.append(complaint(0))
+        with open(log.log_path, 'ab') as f:
+            f.write(b'{"op": "put", "data": {"id": "C1"')
+        assert [c['id'] for c in open_log(directory).load()] == ['C0']
+
+
+def test_compaction_folds_the_log_into_the_snapshot():
+    with tempfile.TemporaryDirectory() as directory:
+        log = open_log(directory)
+        expected = write_history(log)
+        log.compact()
+        assert os.path.getsize(log.log_path) == 0
+        assert by_id(log.load()) == expected
+        assert by_id(open_log(directory).load()) == expected
+
+        # Writes after a compaction land in the fresh log.
+        log.delete('C0')
+        del expected['C0']
+        assert by_id(open_log(directory).load()) == expected
+
+
+def test_compaction_starts_past_the_threshold():
+    with tempfile.TemporaryDirectory() as directory:
+        log = open_log(directory, compact_threshold=1024)
+        for number in range(20):
+            log.append(complaint(number))
+        assert os.path.getsize(log.log_path) < 1024
+        assert os.path.exists(log.snapshot_path)
+        assert len(open_log(directory).load()) == 20
+
+
+def test_aggregates_load_from_the_stats_file():
+    with tempfile.TemporaryDirectory() as directory:
+        log = open_log(directory)
+        write_history(log)
+        log.compact()
+        log.append(complaint(5, status='resolved', category='Water'))
+        expected = log.aggregate('counters', ComplaintCounters.summary)
+
+        fresh = open_log(directory)
+        assert fresh.aggregate('counters', ComplaintCounters.summary) == expected
+        # The stats file plus the log tail sufficed: the snapshot was never read.
+        assert fresh._state is None
+
+
+def test_aggregates_are_recounted_without_usable_stats():
+    for damage in ('missing', 'corrupt', 'old format'):
+        with tempfile.TemporaryDirectory() as directory:
+            log = open_log(directory)
+            write_history(log)
+            log.compact()
+            expected = log.aggregate('counters', ComplaintCounters.summary)
+            if damage == 'missing':
+                os.remove(log.stats_path)
+            elif damage == 'corrupt':
+                with open(log.stats_path, 'w') as f:
+                    f.write('{"format": ')
+            else:
+                with open(log.stats_path) as f:
+                    stats = json.load(f)
+                stats['format'] -= 1
+                with open(log.stats_path, 'w') as f:
+                    json.dump(stats, f)
+
+            fresh = open_log(directory)
+            assert fresh.aggregate('counters', ComplaintCounters.summary) == expected, damage
+            # The recount is saved for the next process.
+            assert open_log(directory).aggregate('counters', ComplaintCounters.summary) == expected
+
+
+def test_index_loads_from_its_file():
+    with tempfile.TemporaryDirectory() as directory:
+        log = open_log(directory)
+        write_history(log)
+        log.compact()
+        index_path = log._index_path('fields')
+        saved = os.stat(index_path).st_mtime_ns
+
+        fresh = open_log(directory)
+        assert [c['id'] for c in fresh.select('fields', {'status': 'pending'})] == ['C0', 'C2', 'C4']
+        # Loaded as saved, not rebuilt (a rebuild writes the file again).
+        assert os.stat(index_path).st_mtime_ns == saved
+
+
+def test_index_is_rebuilt_when_its_file_is_missing():
+    with tempfile.TemporaryDirectory() as directory:
+        log = open_log(directory)
+        write_history(log)
+        log.compact()
+        index_path = log._index_path('fields')
+        os.remove(index_path)
+
+        fresh = open_log(directory)
+        assert [c['id'] for c in fresh.select('fields', {'status': 'resolved'})] == ['C1']
+        assert os.path.exists(index_path)
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"ok  {name}")
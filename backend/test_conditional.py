@@ -0,0 +1,106 @@
+"""Checks for the ETag / Last-Modified revalidation rules of app.conditional.
+
+The API is pointed at a complaint log in a temporary directory, so the data
+in ``backend/data`` is never read or written. Runs under pytest or directly
+(from ``backend/``):
+
+    python test_conditional.py
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+from werkzeug.http import http_date
+
+import app as api
+from storage.complaint_log import ComplaintLog
+from storage.counters import ComplaintCounters
+from storage.secondary_index import SecondaryIndex
+
+
+@contextmanager
+def client_with_log():
+    """A test client serving a fresh complaint log; yields (client, log)."""
+    with tempfile.TemporaryDirectory() as directory:
+        log = ComplaintLog(os.path.join(directory, 'complaints.json'),
+                           aggregates={'counters': ComplaintCounters()},
+                           indexes={'fields': SecondaryIndex()})
+        log.append({'id': 'C0', 'title': 'Broken light', 'status': 'pending'})
+        saved = api.complaint_log
+        api.complaint_log = log
+        try:
+            yield api.app.test_client(), log
+        finally:
+            api.complaint_log = saved
+
+
+def test_matching_etag_answers_304():
+    with client_with_log() as (client, _):
+        first = client.get('/api/complaints')
+        assert first.status_code == 200
+        etag = first.headers['ETag']
+        again = client.get('/api/complaints', headers={'If-None-Match': etag})
+        assert again.status_code == 304
+        assert again.data == b''
+        assert again.headers['ETag'] == etag
+
+
+def test_a_write_changes_the_etag():
+    with client_with_log() as (client, log):
+        etag = client.get('/api/complaints').headers['ETag']
+        log.update('C0', {'status': 'resolved'})
+        response = client.get('/api/complaints', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert response.get_json()['data'][0]['status'] == 'resolved'
+
+
+def test_etag_covers_the_url_and_the_encoding():
+    with client_with_log() as (client, _):
+        listing = client.get('/api/complaints').headers['ETag']
+        filtered = client.get('/api/complaints?status=pending').headers['ETag']
+        gzipped = client.get('/api/complaints', headers={'Accept-Encoding': 'gzip'})
+        assert len({listing, filtered, gzipped.headers['ETag']}) == 3
+        assert 'Accept-Encoding' in gzipped.headers['Vary']
+        # The identity tag does not validate the gzip body.
+        response = client.get('/api/complaints', headers={'Accept-Encoding': 'gzip',
+                                                           'If-None-Match': listing})
+        assert response.status_code == 200
+
+
+def test_if_modified_since_needs_a_full_second():
+    with client_with_log() as (client, log):
+        modified = log.version()[1]
+        # The Last-Modified date itself: a later write in that second shares it.
+        same_second = client.get('/api/complaints',
+                                 headers={'If-Modified-Since': http_date(int(modified))})
+        assert same_second.status_code == 200
+        later = client.get('/api/complaints',
+                           headers={'If-Modified-Since': http_date(int(modified) + 2)})
+        assert later.status_code == 304
+
+
+def test_if_none_match_wins_over_if_modified_since():
+    with client_with_log() as (client, log):
+        modified = log.version()[1]
+        response = client.get('/api/complaints', headers={
+            'If-None-Match': '"stale"', 'If-Modified-Since': http_date(int(modified) + 2)})
+        assert response.status_code == 200
+
+
+def test_errors_and_writes_are_not_tagged():
+    with client_with_log() as (client, _):
+        missing = client.get('/api/complaints/nope')
+        assert missing.status_code == 404
+        assert 'ETag' not in missing.headers
+        patched = client.patch('/api/complaints/C0', json={'status': 'resolved'})
+        assert patched.status_code == 200
+        assert 'ETag' not in patched.headers
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"ok  {name}")
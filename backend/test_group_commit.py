@@ -0,0 +1,104 @@
+"""Checks for storage.group_commit.GroupCommitter.
+
+Runs under pytest or directly (from ``backend/``):
+
+    python test_group_commit.py
+"""
+
+import threading
+import time
+
+from storage.group_commit import GroupCommitter
+
+
+class RecordingWriter:
+    """A write_batch that records (items, fsync) calls and can be slowed down."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.written = set()
+        self.lock = threading.Lock()
+
+    def __call__(self, items, fsync):
+        time.sleep(self.delay)
+        with self.lock:
+            self.calls.append((list(items), fsync))
+            self.written.update(items)
+
+
+def test_every_submit_returns_after_its_own_item_is_written():
+    # max_batch=1 with a slow writer keeps a queue behind every leader, so a
+    # leader's batch regularly holds someone else's item instead of its own.
+    writer = RecordingWriter(delay=0.002)
+    committer = GroupCommitter(writer, max_delay_ms=0, max_batch=1, durability='none')
+    early = []
+
+    def submit(item):
+        committer.submit(item)
+        with writer.lock:
+            if item not in writer.written:
+                early.append(item)
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert early == [], f"submit() returned before writing {early}"
+    assert sorted(item for items, _ in writer.calls for item in items) == list(range(40))
+
+
+def test_lone_submitter_is_not_delayed():
+    writer = RecordingWriter()
+    committer = GroupCommitter(writer, max_delay_ms=500, durability='none')
+    started = time.monotonic()
+    for i in range(3):
+        committer.submit(i)
+    assert time.monotonic() - started < 0.5
+    assert writer.calls == [([0], False), ([1], False), ([2], False)]
+
+
+def test_concurrent_submitters_share_batches():
+    writer = RecordingWriter(delay=0.01)
+    committer = GroupCommitter(writer, max_delay_ms=5, durability='none')
+    threads = [threading.Thread(target=committer.submit, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(item for items, _ in writer.calls for item in items) == list(range(20))
+    assert len(writer.calls) < 20
+
+
+def test_batch_mode_fsyncs_every_batch():
+    writer = RecordingWriter()
+    committer = GroupCommitter(writer, max_delay_ms=0, durability='batch')
+    for i in range(3):
+        committer.submit(i)
+    assert [fsync for _, fsync in writer.calls] == [True, True, True]
+
+
+def test_interval_mode_fsyncs_the_idle_tail():
+    writer = RecordingWriter()
+    committer = GroupCommitter(writer, max_delay_ms=0, durability='interval', fsync_interval=0.2)
+    committer.submit('last before idle')
+    assert writer.calls == [(['last before idle'], False)]
+
+    # No further writes arrive; the timer must still fsync within the interval.
+    deadline = time.monotonic() + 2
+    while len(writer.calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.calls[1:] == [([], True)]
+
+    # Nothing left to fsync: no further timer fires.
+    time.sleep(0.4)
+    assert len(writer.calls) == 2
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"ok  {name}")
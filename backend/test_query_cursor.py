@@ -0,0 +1,110 @@
+"""Checks for cursor pagination in storage.query.select_complaints.
+
+Pages are read the way GET /api/complaints reads them: from the complaint
+log, with the field index's insertion order behind the cursor. Runs under
+pytest or directly (from ``backend/``):
+
+    python test_query_cursor.py
+"""
+
+import os
+import tempfile
+
+from storage.complaint_log import ComplaintLog
+from storage.query import decode_cursor, select_complaints
+from storage.secondary_index import SecondaryIndex
+
+
+def open_log(directory):
+    return ComplaintLog(os.path.join(directory, 'complaints.json'),
+                        indexes={'fields': SecondaryIndex()})
+
+
+def fill(log, count):
+    for number in range(count):
+        log.append({'id': f'C{number}', 'status': 'pending' if number % 3 else 'resolved'})
+
+
+def page(log, cursor, limit=5, filters=None):
+    """One listing request; returns (ids, next cursor)."""
+    filters = filters or {}
+    candidates = log.select('fields', filters)
+    if candidates is None:
+        candidates = log.load()
+    complaints, next_cursor = select_complaints(candidates, filters=filters, limit=limit,
+                                                cursor=cursor, order=log.order('fields'))
+    return [c['id'] for c in complaints], next_cursor
+
+
+def test_pages_cover_every_complaint_once():
+    with tempfile.TemporaryDirectory() as directory:
+        log = open_log(directory)
+        fill(log, 23)
+        seen, cursor = [], None
+        while True:
+            ids, cursor = page(log, cursor)
+            seen.extend(ids)
+            if cursor is None:
+                break
+        assert seen == [f'C{number}' for number in range(23)]
+
+
+def test_resume_after_the_last_record_is_deleted():
+    with tempfile.TemporaryDirectory() as directory:
+        log = open_log(directory)
+        fill(log, 12)
+        ids, cursor = page(log, None)
+        assert ids == ['C0', 'C1', 'C2', 'C3', 'C4']
+        log.delete('C4')
+        assert page(log, cursor)[0] == ['C5', 'C6', 'C7', 'C8', 'C9']
+
+
+def test_resume_after_earlier_records_are_deleted():
+    with tempfile.TemporaryDirectory() as directory:
+        log = open_log(directory)
+        fill(log, 12)
+        _, cursor = page(log, None)
+        # Positions shift left; the next page must not skip C5 and C6.
+        log.delete('C0')
+        log.delete('C1')
+        assert page(log, cursor)[0] == ['C5', 'C6', 'C7', 'C8', 'C9']
+
+
+def test_resume_after_deletes_and_a_compaction():
+    with tempfile.TemporaryDirectory() as directory:
+        log = open_log(directory)
+        fill(log, 12)
+        _, cursor = page(log, None)
+        for key in ('C1', 'C4', 'C5'):
+            log.delete(key)
+        log.compact()
+        assert page(log, cursor)[0] == ['C6', 'C7', 'C8', 'C9', 'C10']
+        # Another process, starting from the persisted index, agrees.
+        assert page(open_log(directory), cursor)[0] == ['C6', 'C7', 'C8', 'C9', 'C10']
+
+
+def test_resume_a_filtered_listing_after_deletes():
+    with tempfile.TemporaryDirectory() as directory:
+        log = open_log(directory)
+        fill(log, 30)
+        ids, cursor = page(log, None, limit=3, filters={'status': 'resolved'})
+        assert ids == ['C0', 'C3', 'C6']
+        # The record the cursor names, and the next one, are gone.
+        log.delete('C6')
+        log.delete('C9')
+        assert page(log, cursor, limit=3, filters={'status': 'resolved'})[0] == ['C12', 'C15', 'C18']
+
+
+def test_cursor_names_the_last_record_scanned():
+    with tempfile.TemporaryDirectory() as directory:
+        log = open_log(directory)
+        fill(log, 12)
+        _, cursor = page(log, None)
+        assert decode_cursor(cursor) == (log.order('fields')('C4'), 'C4')
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"ok  {name}")
@@ -0,0 +1,121 @@
+"""Checks for storage.secondary_index.SecondaryIndex.
+
+Runs under pytest or directly (from ``backend/``):
+
+    python test_secondary_index.py
+"""
+
+import os
+import random
+import tempfile
+
+from storage.complaint_log import ComplaintLog
+from storage.query import complaint_matches
+from storage.secondary_index import SecondaryIndex
+
+STATUSES = ('pending', 'in-progress', 'resolved')
+PRIORITIES = ('High', 'Medium', 'Low')
+DEPARTMENTS = ('IT', 'Maintenance', 'Hostel')
+
+
+def complaint(number, status='pending', priority='High', department='IT'):
+    return {'id': f'C{number}', 'status': status, 'priority': priority, 'department': department}
+
+
+def test_lookup_intersects_the_filtered_fields():
+    index = SecondaryIndex()
+    index.apply(None, complaint(0))
+    index.apply(None, complaint(1, priority='Low'))
+    index.apply(None, complaint(2, department='Hostel'))
+    index.apply(None, complaint(3))
+    assert index.lookup({'status': 'pending', 'priority': 'High', 'department': 'IT'}) == ['C0', 'C3']
+    assert index.lookup({'priority': 'Low'}) == ['C1']
+    assert index.lookup({'status': 'resolved'}) == []
+
+
+def test_lookup_ignores_case():
+    index = SecondaryIndex()
+    index.apply(None, complaint(0, status='Pending'))
+    assert index.lookup({'status': 'PENDING'}) == ['C0']
+
+
+def test_department_falls_back_to_the_analyzer_field():
+    index = SecondaryIndex()
+    index.apply(None, {'id': 'C0', 'assignedDepartment': 'Hostel'})
+    assert index.lookup({'department': 'hostel'}) == ['C0']
+
+
+def test_lookup_declines_without_an_indexed_filter():
+    index = SecondaryIndex()
+    index.apply(None, complaint(0))
+    assert index.lookup({}) is None
+    assert index.lookup({'category': 'Water'}) is None
+
+
+def test_updates_and_deletes_move_the_ids():
+    index = SecondaryIndex()
+    index.apply(None, complaint(0))
+    index.apply(None, complaint(1))
+    index.apply(complaint(0), complaint(0, status='resolved'))
+    assert index.lookup({'status': 'pending'}) == ['C1']
+    assert index.lookup({'status': 'resolved'}) == ['C0']
+
+    index.apply(complaint(1), None)
+    assert index.lookup({'status': 'pending'}) == []
+    assert index.order('C1') is None
+    # Emptied values are dropped, not kept as empty sets.
+    assert 'pending' not in index.to_dict()['postings']['status']
+
+
+def test_results_keep_insertion_order_across_updates():
+    index = SecondaryIndex()
+    for number in range(4):
+        index.apply(None, complaint(number, status='resolved'))
+    # Reopened in reverse order; the listing order must not follow.
+    for number in reversed(range(4)):
+        index.apply(complaint(number, status='resolved'), complaint(number))
+    assert index.lookup({'status': 'pending'}) == ['C0', 'C1', 'C2', 'C3']
+
+
+def test_to_dict_round_trips():
+    index = SecondaryIndex()
+    for number in range(3):
+        index.apply(None, complaint(number, priority=PRIORITIES[number]))
+    index.apply(complaint(1, priority='Medium'), None)
+    loaded = SecondaryIndex()
+    loaded.load_dict(index.to_dict())
+    assert loaded.to_dict() == index.to_dict()
+    loaded.apply(None, complaint(9))
+    assert loaded.order('C9') == 3
+
+
+def test_select_matches_a_full_scan():
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as directory:
+        log = ComplaintLog(os.path.join(directory, 'complaints.json'),
+                           indexes={'fields': SecondaryIndex()})
+        for number in range(200):
+            log.append(complaint(number, rng.choice(STATUSES), rng.choice(PRIORITIES),
+                                 rng.choice(DEPARTMENTS)))
+        for number in rng.sample(range(200), 60):
+            log.update(f'C{number}', {'status': rng.choice(STATUSES),
+                                      'priority': rng.choice(PRIORITIES).lower()})
+        for number in rng.sample(range(200), 30):
+            log.delete(f'C{number}')
+        log.compact()
+        log.append(complaint(200))
+
+        for filters in ({'status': 'pending'}, {'priority': 'high', 'department': 'IT'},
+                        {'status': 'resolved', 'priority': 'Low', 'department': 'Hostel'}):
+            expected = [c for c in log.load() if complaint_matches(c, filters)]
+            assert log.select('fields', filters) == expected, filters
+            # A fresh process answers from the persisted index the same way.
+            fresh = ComplaintLog(log.snapshot_path, indexes={'fields': SecondaryIndex()})
+            assert fresh.select('fields', filters) == expected, filters
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"ok  {name}")
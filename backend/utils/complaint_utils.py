@@ -1,40 +1,58 @@
-import json
 import os
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any
 import uuid
 
+from storage.archive import ComplaintArchive
+from storage.complaint_log import ComplaintLog
+from storage.counters import ComplaintCounters
+from storage.group_commit import GroupCommitter
+from storage.rollups import TimeRollups
+from storage.search_index import SearchIndex
+from storage.secondary_index import SecondaryIndex
+from storage.sequence import SequenceAllocator, id_number
+
 # Get the absolute path to the data directory
 DATA_DIR = Path(__file__).parent.parent / 'data'
 os.makedirs(DATA_DIR, exist_ok=True)
 
 COMPLAINTS_FILE = DATA_DIR / 'complaints.json'
 
+# Shared by the API, so every reader in the process uses one cached copy
+complaint_log = ComplaintLog(
+    COMPLAINTS_FILE,
+    aggregates={'counters': ComplaintCounters(), 'rollups': TimeRollups()},
+    indexes={'fields': SecondaryIndex(), 'search': SearchIndex()},
+    archive=ComplaintArchive(DATA_DIR / 'archive' / 'complaints'),
+)
+
+# Coalesces concurrent new complaints into one log write (and one fsync)
+complaint_committer = GroupCommitter(complaint_log.append_many)
+
+def _max_log_id_number(prefix: str) -> int:
+    """Highest sequence number already used in the log for ``prefix``."""
+    numbers = (id_number(c.get('id'), prefix)
+               for c in complaint_log.iter_complaints(include_archived=True))
+    return max((number for number in numbers if number is not None), default=0)
+
+# Prefixed ids (EDU-0042) for bulk imports, reserved a block per batch
+complaint_sequences = SequenceAllocator(str(DATA_DIR / 'complaint_log_sequences.json'),
+                                        seed=_max_log_id_number)
+
 def load_complaints() -> List[Dict[str, Any]]:
-    """Load all complaints from the JSON file."""
-    if not COMPLAINTS_FILE.exists():
-        return []
-    try:
-        with open(COMPLAINTS_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return []
+    """Load all complaints from the snapshot and its append log.
+
+    The records come from a shared cache; copy one before modifying it.
+    """
+    return complaint_log.load()
 
 def save_complaint(complaint_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Save a new complaint to the JSON file."""
-    complaints = load_complaints()
-    
+    """Append a new complaint to the complaint log via the group committer."""
     # Add metadata
     complaint_data['id'] = str(uuid.uuid4())
     complaint_data['createdAt'] = datetime.utcnow().isoformat()
     complaint_data['status'] = 'pending'
     
-    # Add to the list
-    complaints.append(complaint_data)
-    
-    # Save back to file
-    with open(COMPLAINTS_FILE, 'w') as f:
-        json.dump(complaints, f, indent=2)
-    
+    complaint_committer.submit(complaint_data)
     return complaint_data
@@ -1,22 +1,26 @@
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
-import joblib
 import os
-import json
 import uuid
 from datetime import datetime, timedelta
 import random
 from pathlib import Path
 
-# Initialize models as None
-category_model = None
-priority_model = None
-type_model = None
-department_model = None
+from batcher import MicroBatcher
+from complaint_store import ComplaintFile
+from services.analysis_cache import AnalysisCache
+from services.classifier import Classifier
+from storage.serialization import JSONProvider
+from utils.compression import init_compression
+
+# Fused classifier (or the four pipelines), set by load_models()
+classifier = None
+# Analyses by normalized text and model version (ANALYSIS_CACHE_SIZE entries)
+analysis_cache = AnalysisCache()
 
 def load_models():
-    """Load all the ML models"""
-    global category_model, priority_model, type_model, department_model
+    """Load the ML models"""
+    global classifier
     
     try:
         # Get the directory of the current script
@@ -33,32 +37,12 @@ def load_models():
             print(f"Models directory not found at: {models_dir}")
             print(f"Current directory contents: {os.listdir(script_dir)}")
             return False
-            
-        # Check if model files exist
-        model_files = {
-            'category': models_dir / 'category_model.pkl',
-            'priority': models_dir / 'priority_model.pkl',
-            'type': models_dir / 'type_model.pkl',
-            'department': models_dir / 'department_model.pkl'
-        }
-        
-        # Verify all model files exist
-        for name, path in model_files.items():
-            if not path.exists():
-                print(f"Model file not found: {path}")
-                print(f"Available files in models directory: {os.listdir(models_dir)}")
-                return False
         
-        # Load all models
         print("Loading models...")
-        category_model = joblib.load(model_files['category'])
-        print("Loaded category model")
-        priority_model = joblib.load(model_files['priority'])
-        print("Loaded priority model")
-        type_model = joblib.load(model_files['type'])
-        print("Loaded type model")
-        department_model = joblib.load(model_files['department'])
-        print("Loaded department model")
+        classifier = Classifier.load(str(models_dir))
+        print(f"Loaded models from {classifier.source}")
+        # Entries of the previous models can no longer be hit; free them
+        analysis_cache.clear()
         
         print("All models loaded successfully!")
         return True
@@ -74,20 +58,34 @@ if not models_loaded:
     print("Failed to load one or more models. Please check the model files.")
     # Don't exit here, let the application start but it will fail the health check
 
+# Concurrent analyses are classified together (ANALYZE_MAX_BATCH / ANALYZE_MAX_WAIT_MS)
+analysis_batcher = MicroBatcher(lambda texts: classifier.classify(texts))
+
+def warm_up():
+    """Run one prediction so the first request does not pay for lazy setup."""
+    if classifier is not None:
+        classifier.classify(['The projector in the main lecture hall has stopped working.'])
+
+def analyze(text):
+    """Analysis of one text: from the cache, else batched with concurrent requests."""
+    model = classifier
+    analysis = analysis_cache.get(text, model.version)
+    if analysis is None:
+        analysis = analysis_batcher.submit(text)
+        analysis_cache.put(text, model.version, analysis)
+    return analysis
+
 app = Flask(__name__)
+app.json = JSONProvider(app)
 CORS(app)  # Enable CORS for all routes
+init_compression(app)  # gzip large responses for clients that accept it
 
 @app.route('/health')
 def health_check():
     """Health check endpoint for Render service monitoring."""
     try:
-        # Check if all required models are loaded and callable
-        models_loaded = all([
-            'category_model' in globals() and callable(globals()['category_model'].predict),
-            'priority_model' in globals() and callable(globals()['priority_model'].predict),
-            'type_model' in globals() and callable(globals()['type_model'].predict),
-            'department_model' in globals() and callable(globals()['department_model'].predict)
-        ])
+        # Check that the classifier loaded
+        models_loaded = classifier is not None
         
         if not models_loaded:
             return jsonify({
@@ -127,20 +125,16 @@ os.makedirs(DATA_DIR, exist_ok=True)
 
 # Initialize empty complaints file if it doesn't exist
 if not COMPLAINTS_FILE.exists():
-    with open(COMPLAINTS_FILE, 'w') as f:
-        json.dump([], f)
+    COMPLAINTS_FILE.write_bytes(b'[]')
+
+# complaints.json plus its id -> byte offset index
+complaint_file = ComplaintFile(COMPLAINTS_FILE)
 
 def save_complaint(complaint_data):
     """Save a new complaint to the JSON file with AI analysis"""
     try:
         # Get AI analysis
-        analysis = {
-            'category': category_model.predict([complaint_data['description']])[0],
-            'priority': priority_model.predict([complaint_data['description']])[0],
-            'type': type_model.predict([complaint_data['description']])[0],
-            'assignedDepartment': department_model.predict([complaint_data['description']])[0],
-            'aiConfidence': round(category_model.predict_proba([complaint_data['description']]).max() * 100, 2)
-        }
+        analysis = analyze(complaint_data['description'])
         
         # Create complaint object
         complaint = {
@@ -152,12 +146,7 @@ def save_complaint(complaint_data):
         }
         
         # Save to file
-        with open(COMPLAINTS_FILE, 'r+') as f:
-            complaints = json.load(f)
-            complaints.append(complaint)
-            f.seek(0)
-            json.dump(complaints, f, indent=2)
-            f.truncate()
+        complaint_file.append(complaint)
             
         return complaint
         
@@ -176,27 +165,11 @@ def analyze_complaint():
         if not complaint_text:
             return jsonify({'error': 'Complaint text cannot be empty'}), 400
 
-        # --- Predictions from all models ---
-        predicted_category = category_model.predict([complaint_text])[0]
-        predicted_priority = priority_model.predict([complaint_text])[0]
-        predicted_type = type_model.predict([complaint_text])[0]
-        
-        # Naye model se department predict karein (YAHAN CODE UPDATE HUA HAI)
-        assigned_department = department_model.predict([complaint_text])[0]
-        
-        # Confidence score (example ke liye abhi sirf category ka use kar rahe hain)
-        category_probas = category_model.predict_proba([complaint_text])
-        confidence = round(category_probas.max() * 100, 2)
+        # --- Predictions from all models (cached, batched with concurrent requests) ---
+        analysis = analyze(complaint_text)
 
         # Frontend ko bhejne ke liye response taiyaar karein
-        response = {
-            'complaintText': complaint_text,
-            'category': predicted_category,
-            'priority': predicted_priority,
-            'type': predicted_type,
-            'assignedDepartment': assigned_department, # Model se aayi hui prediction
-            'aiConfidence': confidence
-        }
+        response = {'complaintText': complaint_text, **analysis}
         
         return jsonify(response)
 
@@ -205,6 +178,46 @@ def analyze_complaint():
         return jsonify({'error': 'An error occurred during analysis.'}), 500
 
 
+@app.route('/analyze/stats', methods=['GET'])
+def analyze_stats():
+    """Micro-batching metrics (queue depth, batch sizes) and analysis cache counters."""
+    return jsonify({**analysis_batcher.stats(), 'cache': analysis_cache.stats()})
+
+
+# Most texts accepted by one /analyze/batch request
+MAX_ANALYZE_BATCH = int(os.getenv('MAX_ANALYZE_BATCH', '1000'))
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Classify many texts in one pass; each result matches /analyze for that text."""
+    try:
+        data = request.get_json(force=True)
+        texts = data.get('texts') if isinstance(data, dict) else None
+
+        if not isinstance(texts, list) or not texts:
+            return jsonify({'error': 'texts must be a non-empty list'}), 400
+        if len(texts) > MAX_ANALYZE_BATCH:
+            return jsonify({'error': f'At most {MAX_ANALYZE_BATCH} texts per request'}), 400
+        for i, text in enumerate(texts):
+            if not isinstance(text, str) or not text:
+                return jsonify({'error': f'Complaint text at index {i} cannot be empty'}), 400
+
+        model = classifier
+        analyses = [analysis_cache.get(text, model.version) for text in texts]
+        missing = [i for i, analysis in enumerate(analyses) if analysis is None]
+        if missing:
+            for i, analysis in zip(missing, model.classify([texts[i] for i in missing])):
+                analysis_cache.put(texts[i], model.version, analysis)
+                analyses[i] = analysis
+        return jsonify({'results': [
+            {'complaintText': text, **analysis} for text, analysis in zip(texts, analyses)
+        ]})
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return jsonify({'error': 'An error occurred during analysis.'}), 500
+
+
 @app.route('/api/complaints', methods=['GET', 'POST'])
 def handle_complaints():
     if request.method == 'POST':
@@ -217,36 +230,29 @@ def handle_complaints():
     else:
         # GET all complaints
         try:
-            with open(COMPLAINTS_FILE, 'r') as f:
-                complaints = json.load(f)
-            return jsonify(complaints)
+            return jsonify(complaint_file.all())
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
 @app.route('/api/complaints/<complaint_id>', methods=['GET', 'PATCH', 'DELETE'])
 def handle_complaint(complaint_id):
     try:
-        with open(COMPLAINTS_FILE, 'r') as f:
-            complaints = json.load(f)
-        
-        complaint = next((c for c in complaints if c['id'] == complaint_id), None)
-        if not complaint:
-            return jsonify({'error': 'Complaint not found'}), 404
-            
         if request.method == 'GET':
+            complaint = complaint_file.get(complaint_id)
+            if not complaint:
+                return jsonify({'error': 'Complaint not found'}), 404
             return jsonify(complaint)
             
         elif request.method == 'PATCH':
             data = request.get_json()
-            complaint.update(data)
-            with open(COMPLAINTS_FILE, 'w') as f:
-                json.dump(complaints, f, indent=2)
+            complaint = complaint_file.update(complaint_id, data)
+            if not complaint:
+                return jsonify({'error': 'Complaint not found'}), 404
             return jsonify(complaint)
             
         elif request.method == 'DELETE':
-            complaints = [c for c in complaints if c['id'] != complaint_id]
-            with open(COMPLAINTS_FILE, 'w') as f:
-                json.dump(complaints, f, indent=2)
+            if not complaint_file.delete(complaint_id):
+                return jsonify({'error': 'Complaint not found'}), 404
             return '', 204
             
     except Exception as e:
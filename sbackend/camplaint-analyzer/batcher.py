@@ -0,0 +1,123 @@
+"""Micro-batching for concurrent /analyze requests.
+
+Texts submitted by concurrent request threads are classified together in one
+batch. There is no background thread: the first waiting request becomes the
+leader. It waits until ANALYZE_MAX_BATCH texts are queued or the oldest has
+waited ANALYZE_MAX_WAIT_MS, classifies the batch, and hands every waiting
+request its own result. Requests that arrive meanwhile queue for the next
+batch. A lone request therefore pays at most ANALYZE_MAX_WAIT_MS extra.
+
+stats() reports the queue depth and the batch sizes seen so far.
+"""
+import os
+import threading
+import time
+
+ANALYZE_MAX_BATCH = int(os.getenv('ANALYZE_MAX_BATCH', '64'))
+ANALYZE_MAX_WAIT_MS = float(os.getenv('ANALYZE_MAX_WAIT_MS', '5'))
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    def __init__(self, run_batch, max_batch=ANALYZE_MAX_BATCH, max_wait_ms=ANALYZE_MAX_WAIT_MS):
+        """run_batch(items) must return one result per item, in order."""
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._leader_active = False
+
+        # Metrics, guarded by _cond
+        self._batches = 0
+        self._items = 0
+        self._max_queue_depth = 0
+        self._queue_wait_total = 0.0
+        self._size_histogram = {f'le_{bound}': 0 for bound in BATCH_SIZE_BUCKETS}
+        self._size_histogram['more'] = 0
+
+    def submit(self, item):
+        """Queue one item and return its result once its batch has run.
+
+        Re-raises the error if running the batch failed.
+        """
+        ticket = {'item': item, 'done': False, 'result': None, 'error': None,
+                  'queued': time.monotonic()}
+        with self._cond:
+            self._pending.append(ticket)
+            self._max_queue_depth = max(self._max_queue_depth, len(self._pending))
+            if len(self._pending) >= self.max_batch:
+                # A full batch need not wait out the deadline
+                self._cond.notify_all()
+        while True:
+            with self._cond:
+                while self._leader_active and not ticket['done']:
+                    self._cond.wait()
+                if ticket['done']:
+                    break
+                self._leader_active = True
+            # A full queue can leave this ticket out of the batch it leads; lead again
+            self._lead()
+        if ticket['error'] is not None:
+            raise ticket['error']
+        return ticket['result']
+
+    def _lead(self):
+        """Collect and run one batch as the leader, then hand over to the next waiter."""
+        batch = []
+        results = None
+        error = None
+        try:
+            with self._cond:
+                deadline = self._pending[0]['queued'] + self.max_wait
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:len(batch)]
+            started = time.monotonic()
+            results = self.run_batch([ticket['item'] for ticket in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"run_batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            error = e
+        finally:
+            with self._cond:
+                for i, ticket in enumerate(batch):
+                    ticket['done'] = True
+                    ticket['error'] = error
+                    ticket['result'] = results[i] if error is None else None
+                if batch:
+                    self._record(len(batch), sum(started - t['queued'] for t in batch))
+                self._leader_active = False
+                # Anyone still pending (queued during the run) elects a new leader
+                self._cond.notify_all()
+
+    def _record(self, size, queue_wait):
+        self._batches += 1
+        self._items += size
+        self._queue_wait_total += queue_wait
+        bucket = next((f'le_{bound}' for bound in BATCH_SIZE_BUCKETS if size <= bound), 'more')
+        self._size_histogram[bucket] += 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+                'queue_depth': len(self._pending),
+                'max_queue_depth': self._max_queue_depth,
+                'batches': self._batches,
+                'items': self._items,
+                'mean_batch_size': round(self._items / self._batches, 2) if self._batches else 0,
+                'mean_queue_wait_ms': (round(self._queue_wait_total / self._items * 1000, 3)
+                                       if self._items else 0),
+                'batch_size_histogram': dict(self._size_histogram),
+            }
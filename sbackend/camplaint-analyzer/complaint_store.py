@@ -0,0 +1,132 @@
+"""Storage helpers for the analyzer's complaints.json.
+
+The file stays a plain JSON array, but every write also records the byte span
+of each complaint in an id index (complaints.index.json next to the data file).
+Looking up a single complaint is then one seek and one small loads() call
+instead of parsing the whole array. Records are written compactly, one per
+line (see storage/serialization.py). The index stores the data file's
+(mtime, size) and is rebuilt whenever the file was changed behind its back,
+e.g. by another worker or by hand. The locking and span helpers are the
+backend's (storage/locking.py, storage/id_index.py; see sync_shared.py).
+
+Writes from several gunicorn workers are serialized with an advisory lock on
+complaints.json.lock, and the file is always replaced atomically, so readers
+never see a half-written array and no worker overwrites another's complaint.
+"""
+import os
+
+from storage.id_index import dump_records, scan_spans
+from storage.locking import atomic_write, file_lock
+from storage.serialization import JSONDecodeError, dumps, load_file, loads
+
+
+class ComplaintFile:
+    def __init__(self, path):
+        self.path = str(path)
+        self.index_path = os.path.splitext(self.path)[0] + '.index.json'
+        self._spans = {}
+        self._signature = None
+        self._load_index()
+        self._refresh()
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+    def _load_index(self):
+        try:
+            stored = load_file(self.index_path)
+        except (JSONDecodeError, FileNotFoundError):
+            return
+        self._signature = stored.get('signature')
+        self._spans = {cid: tuple(span) for cid, span in stored.get('ids', {}).items()}
+
+    def _set_spans(self, entries, signature):
+        self._spans = {str(cid): span for cid, span in entries if cid is not None}
+        self._signature = signature
+        stored = {'signature': self._signature, 'ids': self._spans}
+        atomic_write(self.index_path, dumps(stored), fsync=False)
+
+    def _refresh(self):
+        """Rebuild the index if complaints.json changed since it was written."""
+        if self._signature == self._file_signature():
+            return
+        self._load_index()
+        if self._signature == self._file_signature():
+            return
+        signature = None
+        entries = []
+        try:
+            with open(self.path, 'rb') as f:
+                # Sign the file we actually read, even if it is replaced meanwhile
+                st = os.fstat(f.fileno())
+                signature = [st.st_ino, st.st_mtime_ns, st.st_size]
+                entries = scan_spans(f.read())
+        except (OSError, ValueError):
+            pass
+        self._set_spans(entries, signature)
+
+    def all(self):
+        """Load every complaint."""
+        return load_file(self.path)
+
+    def get(self, complaint_id):
+        """Return one complaint by id without parsing the rest of the file."""
+        for _ in range(2):
+            self._refresh()
+            span = self._spans.get(str(complaint_id))
+            if span is None:
+                return None
+            offset, length = span
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                try:
+                    complaint = loads(f.read(length))
+                except ValueError:
+                    complaint = None
+            if complaint is not None and str(complaint.get('id')) == str(complaint_id):
+                return complaint
+            # The file was rewritten after the refresh; _refresh() re-indexes it.
+        return None
+
+    def _write_all(self, complaints):
+        """Atomically rewrite the file and re-index it; caller holds the lock."""
+        body, spans = dump_records(complaints)
+        atomic_write(self.path, body)
+        self._set_spans(((c.get('id'), span) for c, span in zip(complaints, spans)),
+                        self._file_signature())
+
+    def append(self, complaint):
+        with file_lock(self.path):
+            complaints = self.all()
+            complaints.append(complaint)
+            self._write_all(complaints)
+        return complaint
+
+    def update(self, complaint_id, changes):
+        """Apply changes to one complaint; returns the updated complaint or None."""
+        if self.get(complaint_id) is None:
+            return None
+        with file_lock(self.path):
+            complaints = self.all()
+            complaint = next((c for c in complaints if str(c.get('id')) == str(complaint_id)), None)
+            if complaint is None:
+                return None
+            complaint.update(changes)
+            self._write_all(complaints)
+        return complaint
+
+    def delete(self, complaint_id):
+        """Remove one complaint; returns False if it did not exist."""
+        if self.get(complaint_id) is None:
+            return False
+        with file_lock(self.path):
+            complaints = self.all()
+            remaining = [c for c in complaints if str(c.get('id')) != str(complaint_id)]
+            if len(remaining) == len(complaints):
+                return False
+            self._write_all(remaining)
+        return True
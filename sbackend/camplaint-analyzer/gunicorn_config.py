@@ -0,0 +1,31 @@
+import gc
+import os
+
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+# Threads let concurrent /analyze requests share a micro-batch within a worker
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout = 120
+bind = f"0.0.0.0:{os.getenv('PORT', '10001')}"
+
+# Import app.py (which loads the models) once in the master; the forked
+# workers share those pages copy-on-write. GUNICORN_PRELOAD=0 loads them
+# in every worker instead.
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') != '0'
+
+
+def _warm_up():
+    from app import warm_up
+    warm_up()
+
+
+def on_starting(server):
+    if preload_app:
+        _warm_up()
+        # Keep worker collections from writing to (and so copying) the shared pages
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        _warm_up()
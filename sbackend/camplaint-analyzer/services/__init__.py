@@ -0,0 +1,2 @@
+# Makes `backend.services` a package for analyzer imports.
+
@@ -0,0 +1,73 @@
+"""LRU cache of complaint analyses, addressed by content.
+
+The key is a hash of the normalized complaint text (lowercased, whitespace
+collapsed, which is what the vectorizer sees anyway) plus the model version,
+so a resubmitted or retried complaint is not classified again, and entries
+from an older model can never be returned after a reload.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+ANALYSIS_CACHE_SIZE = int(os.getenv('ANALYSIS_CACHE_SIZE', '10000'))
+
+
+def normalize_text(text: str) -> str:
+    return ' '.join(text.lower().split())
+
+
+class AnalysisCache:
+    def __init__(self, max_entries: int = ANALYSIS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[bytes, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, model_version: str) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(model_version.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(normalize_text(text).encode('utf-8'))
+        return digest.digest()
+
+    def get(self, text: str, model_version: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached analysis, or None."""
+        key = self.key(text, model_version)
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(analysis)
+
+    def put(self, text: str, model_version: str, analysis: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        key = self.key(text, model_version)
+        with self._lock:
+            self._entries[key] = dict(analysis)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
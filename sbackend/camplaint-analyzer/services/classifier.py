@@ -0,0 +1,145 @@
+"""Complaint classification with the category, priority, type and department heads.
+
+sbackend's ``train.py`` saves ``models/fused_model.pkl``, a pickled dict
+holding one ``TfidfVectorizer`` shared by the four ``MultinomialNB`` heads. A
+complaint is then tokenized and vectorized once, every head reads the same
+sparse matrix, and each head's label and probability come from a single
+``predict_proba`` call.
+
+``train.py`` also exports that model to ``models/scorer/`` (see
+:mod:`services.scorer`), which scores with numpy alone from memory-mapped
+arrays. :meth:`Classifier.load` prefers it; without it the fused model is
+unpickled, and model directories with only the four ``*_model.pkl``
+pipelines still load: each pipeline's vectorizer runs once and its
+classifier is used as a head.
+
+The analyzer runs a copy of this module (see sbackend's ``sync_shared.py``).
+"""
+
+import hashlib
+import logging
+import os
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from services.scorer import MANIFEST_FILE, SCORER_DIR, Scorer
+
+HEADS = ("category", "priority", "type", "department")
+FUSED_MODEL_FILE = "fused_model.pkl"
+
+# (vectorizer, {head: classifier}) per distinct vectorizer
+ModelGroup = Tuple[Any, Dict[str, Any]]
+
+# Checked by check_parity() besides the training texts
+EDGE_CASES = [
+    "a",  # no tokens
+    "the and of it is",  # only stop words
+    "zzqx blorf wibble",  # only unknown words
+    "WiFi NOT working!!! wifi not working in HOSTEL",  # case and repeats
+    "Café naïve résumé — straße",  # non-ASCII
+    "water leakage " * 200,  # long, one term dominating
+]
+
+
+def model_version(paths: Sequence[str]) -> str:
+    """Identify the model files by name, size and mtime."""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        st = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+class SklearnModel:
+    """The pickled vectorizer(s) and MultinomialNB heads, scored through sklearn."""
+
+    def __init__(self, groups: List[ModelGroup]):
+        self.groups = groups
+
+    def predict(self, texts: Sequence[str]) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Return ({head: labels}, category confidence), each with one entry per text."""
+        labels = {}
+        for vectorizer, heads in self.groups:
+            features = vectorizer.transform(texts)
+            for head, estimator in heads.items():
+                proba = estimator.predict_proba(features)
+                # Same argmax as predict(), so labels match the pipelines'
+                labels[head] = estimator.classes_[proba.argmax(axis=1)]
+                if head == "category":
+                    confidence = proba.max(axis=1)
+        return labels, confidence
+
+
+Model = Union[Scorer, SklearnModel]
+
+
+class Classifier:
+    def __init__(self, model: Model, source: str, version: str):
+        self.model = model
+        self.source = source
+        # Changes whenever the model files do; keys the analysis cache
+        self.version = version
+
+    @classmethod
+    def load(cls, models_dir: str) -> "Classifier":
+        """Load the numpy scorer, or fall back to the pickled sklearn models."""
+        scorer_dir = os.path.join(models_dir, SCORER_DIR)
+        if os.path.exists(os.path.join(scorer_dir, MANIFEST_FILE)):
+            logging.info("Loading numpy scorer from %s", scorer_dir)
+            scorer = Scorer.load(scorer_dir)
+            return cls(scorer, scorer_dir, scorer.version)
+        return cls.load_sklearn(models_dir)
+
+    @classmethod
+    def load_sklearn(cls, models_dir: str) -> "Classifier":
+        """Load the fused model, or fall back to the four per-head pipelines."""
+        # Only this path needs joblib (and sklearn, pulled in by unpickling)
+        import joblib
+
+        fused_path = os.path.join(models_dir, FUSED_MODEL_FILE)
+        if os.path.exists(fused_path):
+            logging.info("Loading fused model from %s", fused_path)
+            fused = joblib.load(fused_path)
+            return cls(SklearnModel([(fused["vectorizer"], dict(fused["heads"]))]), fused_path,
+                       model_version([fused_path]))
+        paths = [os.path.join(models_dir, f"{head}_model.pkl") for head in HEADS]
+        groups = []
+        for head, path in zip(HEADS, paths):
+            if not os.path.exists(path):
+                raise FileNotFoundError(
+                    f"Model file '{path}' not found. "
+                    "Ensure sbackend models are trained and available."
+                )
+            logging.info("Loading %s model from %s", head, path)
+            pipeline = joblib.load(path)
+            groups.append((pipeline[:-1], {head: pipeline[-1]}))
+        return cls(SklearnModel(groups), models_dir, model_version(paths))
+
+    def classify(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        """Return one analysis dict per text, in order, from one pass of the model."""
+        labels, confidence = self.model.predict(texts)
+        return [
+            {
+                "category": str(labels["category"][i]),
+                "priority": str(labels["priority"][i]),
+                "type": str(labels["type"][i]),
+                "assignedDepartment": str(labels["department"][i]),
+                "aiConfidence": round(float(confidence[i]) * 100, 2),
+            }
+            for i in range(len(texts))
+        ]
+
+
+def check_parity(models_dir: str, texts: Sequence[str]) -> List[Tuple[str, Dict, Dict]]:
+    """Return [(text, sklearn analysis, scorer analysis)] for every text they disagree on.
+
+    Compares the scorer export in ``models_dir`` against the ``fused_model.pkl``
+    next to it; sbackend's ``train.py`` runs it right after exporting.
+    """
+    reference = Classifier.load_sklearn(models_dir).classify(texts)
+    scorer_dir = os.path.join(models_dir, SCORER_DIR)
+    scorer = Scorer.load(scorer_dir)
+    analyses = Classifier(scorer, scorer_dir, scorer.version).classify(texts)
+    return [(text, expected, actual)
+            for text, expected, actual in zip(texts, reference, analyses) if expected != actual]
@@ -0,0 +1,216 @@
+"""Numpy-only scorer for the fused TF-IDF + MultinomialNB model.
+
+sbackend's ``train.py`` exports the fitted model to ``models/scorer/`` with
+:func:`export_scorer`::
+
+    manifest.json   format and version, vectorizer settings, stop words, and
+                    the classes and log_prob columns of each head
+    vocab.npy       the n-gram vocabulary, sorted (which is sklearn's column order)
+    idf.npy         idf of each term
+    log_prob.npy    feature_log_prob_ of every head side by side, one row per term
+    log_prior.npy   class_log_prior_ of every head, in the same column order
+
+:meth:`Scorer.load` memory-maps the arrays, so serving needs neither sklearn
+nor unpickling, and preloaded gunicorn workers share the pages.
+
+Scoring repeats the sklearn steps for a whole batch and adds up each text's
+terms in the same order as sklearn and scipy, so the joint log likelihoods
+are bit for bit those of the sklearn model; sbackend's ``test_scorer.py``
+checks the parity. The analyzer runs a copy of this module (see sbackend's
+``sync_shared.py``).
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, List, Mapping, Sequence, Tuple, Union
+
+import numpy as np
+
+SCORER_DIR = "scorer"
+# Bump when the files or their meaning change; load() rejects other formats
+SCORER_FORMAT = 1
+MANIFEST_FILE = "manifest.json"
+ARRAYS = ("vocab", "idf", "log_prob", "log_prior")
+
+# Vectorizer settings the scorer does not implement must have these values
+_REQUIRED_PARAMS = {
+    "analyzer": "word",
+    "input": "content",
+    "preprocessor": None,
+    "tokenizer": None,
+    "strip_accents": None,
+    "binary": False,
+    "use_idf": True,
+    "sublinear_tf": False,
+    "norm": "l2",
+}
+
+
+def _replace_file(path: str, write: Callable[[IO[bytes]], Any]) -> None:
+    # Write beside the target and rename, so a server that has the old file
+    # mapped keeps reading the old data instead of a truncated file
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def export_scorer(vectorizer: Any, heads: Mapping[str, Any], out_dir: str) -> Dict[str, Any]:
+    """Write a fitted ``TfidfVectorizer`` and its ``{head: MultinomialNB}`` to ``out_dir``.
+
+    Returns the manifest, whose ``version`` is a hash of the exported model.
+    """
+    params = vectorizer.get_params()
+    unsupported = {name: params[name] for name, value in _REQUIRED_PARAMS.items()
+                   if params[name] != value}
+    if unsupported:
+        raise ValueError(f"Vectorizer settings not supported by the scorer: {unsupported}")
+
+    terms = sorted(vectorizer.vocabulary_)
+    columns = np.array([vectorizer.vocabulary_[term] for term in terms])
+    head_info = []
+    log_prob = []
+    log_prior = []
+    start = 0
+    for name, estimator in heads.items():
+        classes = [str(label) for label in estimator.classes_]
+        head_info.append({"name": name, "classes": classes, "start": start, "stop": start + len(classes)})
+        start += len(classes)
+        log_prob.append(estimator.feature_log_prob_[:, columns].T)
+        log_prior.append(estimator.class_log_prior_)
+    arrays = {
+        "vocab": np.array(terms),
+        "idf": np.ascontiguousarray(vectorizer.idf_[columns], dtype=np.float64),
+        "log_prob": np.ascontiguousarray(np.hstack(log_prob), dtype=np.float64),
+        "log_prior": np.ascontiguousarray(np.concatenate(log_prior), dtype=np.float64),
+    }
+    stop_words = vectorizer.get_stop_words()
+    manifest = {
+        "format": SCORER_FORMAT,
+        "lowercase": bool(vectorizer.lowercase),
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": list(vectorizer.ngram_range),
+        "stop_words": sorted(stop_words) if stop_words is not None else None,
+        "heads": head_info,
+    }
+    # Content hash, so the version (and the analysis cache key) only changes with the model
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(json.dumps(manifest, sort_keys=True).encode("utf-8"))
+    for name in ARRAYS:
+        digest.update(arrays[name].tobytes())
+    manifest["version"] = digest.hexdigest()
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name in ARRAYS:
+        _replace_file(os.path.join(out_dir, f"{name}.npy"), lambda f, a=arrays[name]: np.save(f, a))
+    # Manifest last: it is what load() looks for
+    _replace_file(os.path.join(out_dir, MANIFEST_FILE),
+                  lambda f: f.write(json.dumps(manifest, indent=2).encode("utf-8")))
+    return manifest
+
+
+def _running_sum(values: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Sum each run ``values[start:start + length]``, adding its entries front to back.
+
+    ``np.sum`` and ``np.add.reduceat`` may pair the entries up differently from
+    sklearn's l2 normalize and scipy's sparse product, which changes the last
+    bits; adding the k-th entry of every run at once keeps their order.
+    """
+    if len(starts) == 1:
+        return np.cumsum(values, axis=0)[-1:]
+    # Longest runs first, so the runs still going at step k are a prefix
+    order = np.argsort(-lengths, kind="stable")
+    starts, lengths = starts[order], lengths[order]
+    total = np.zeros((len(starts),) + values.shape[1:])
+    for k in range(lengths[0]):
+        going = np.count_nonzero(lengths > k)
+        total[:going] += values[starts[:going] + k]
+    result = np.empty_like(total)
+    result[order] = total
+    return result
+
+
+class Scorer:
+    def __init__(self, manifest: Dict, arrays: List[np.ndarray], source: Path):
+        self.source = source
+        self.version: str = manifest["version"]
+        self.vocab, self.idf, self.log_prob, self.log_prior = arrays
+        self._lowercase = manifest["lowercase"]
+        self._token_pattern = re.compile(manifest["token_pattern"])
+        self._ngram_range = tuple(manifest["ngram_range"])
+        stop_words = manifest["stop_words"]
+        self._stop_words = frozenset(stop_words) if stop_words is not None else None
+        # head -> (classes, its columns of log_prob and log_prior)
+        self.heads: Dict[str, Tuple[np.ndarray, slice]] = {
+            head["name"]: (np.array(head["classes"]), slice(head["start"], head["stop"]))
+            for head in manifest["heads"]
+        }
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Scorer":
+        path = Path(path)
+        manifest = json.loads((path / MANIFEST_FILE).read_text(encoding="utf-8"))
+        if manifest.get("format") != SCORER_FORMAT:
+            raise ValueError(f"Unsupported scorer format {manifest.get('format')!r} in {path}")
+        # Plain ndarray views of the maps: indexing np.memmap itself is slower
+        arrays = [np.asarray(np.load(path / f"{name}.npy", mmap_mode="r")) for name in ARRAYS]
+        vocab, idf, log_prob, log_prior = arrays
+        n_classes = sum(len(head["classes"]) for head in manifest["heads"])
+        if (idf.shape != vocab.shape or log_prob.shape != (len(vocab), n_classes)
+                or log_prior.shape != (n_classes,)):
+            raise ValueError(f"Scorer arrays in {path} do not match its manifest")
+        return cls(manifest, arrays, path)
+
+    def terms(self, text: str) -> List[str]:
+        """The n-grams ``TfidfVectorizer.build_analyzer()`` would produce."""
+        if self._lowercase:
+            text = text.lower()
+        tokens = self._token_pattern.findall(text)
+        if self._stop_words is not None:
+            tokens = [token for token in tokens if token not in self._stop_words]
+        min_n, max_n = self._ngram_range
+        terms = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+    def _joint_log_likelihood(self, texts: Sequence[str]) -> np.ndarray:
+        """One row per text: the joint log likelihood of every class of every head."""
+        jll = np.zeros((len(texts), len(self.log_prior)))
+        terms = [self.terms(text) for text in texts]
+        flat = [term for text_terms in terms for term in text_terms]
+        if flat:
+            flat = np.array(flat)
+            positions = np.searchsorted(self.vocab, flat)
+            # Past the end means after every term, so the check below rejects it
+            positions[positions == len(self.vocab)] = 0
+            found = self.vocab[positions] == flat
+            rows = np.repeat(np.arange(len(texts)), [len(text_terms) for text_terms in terms])[found]
+            # Term counts per (text, column), ordered like the rows of a CSR matrix
+            keys, counts = np.unique(rows * len(self.vocab) + positions[found], return_counts=True)
+            rows, columns = np.divmod(keys, len(self.vocab))
+            if len(rows):
+                text_rows, starts, lengths = np.unique(rows, return_index=True, return_counts=True)
+                weights = counts * self.idf[columns]
+                weights /= np.repeat(np.sqrt(_running_sum(weights * weights, starts, lengths)), lengths)
+                jll[text_rows] = _running_sum(weights[:, None] * self.log_prob[columns], starts, lengths)
+        return jll + self.log_prior
+
+    def predict(self, texts: Sequence[str]) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Return ({head: labels}, category confidence), each with one entry per text."""
+        jll = self._joint_log_likelihood(texts)
+        labels = {}
+        confidence = None
+        for head, (classes, columns) in self.heads.items():
+            head_jll = jll[:, columns]
+            # predict_proba: normalize with logsumexp
+            top = head_jll.max(axis=1, keepdims=True)
+            log_norm = np.log(np.sum(np.exp(head_jll - top), axis=1, keepdims=True)) + top
+            proba = np.exp(head_jll - log_norm)
+            labels[head] = classes[proba.argmax(axis=1)]
+            if head == "category":
+                confidence = proba.max(axis=1)
+        return labels, confidence
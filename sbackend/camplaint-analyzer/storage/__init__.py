@@ -0,0 +1 @@
+# Makes `backend.storage` a package for the complaint persistence layer.
@@ -0,0 +1,153 @@
+"""JSON encoding shared by the complaint stores and the API responses.
+
+Everything the backend persists or returns as JSON goes through :func:`dumps`
+and :func:`loads`, so the wire and on-disk format is decided in one place:
+compact UTF-8 with no indentation and no padding after separators. Files
+written in the old pretty-printed layout still load unchanged.
+
+When the optional ``orjson`` package is installed it does the encoding and
+decoding; otherwise the standard library produces the same documents, with
+dates and other non-JSON types left to the ``default`` hook either way. Set
+``COMPLAINT_JSON=stdlib`` to force the fallback, e.g. to rule orjson out when
+debugging. ``python -m storage.serialization`` benchmarks both encoders.
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Optional, Union
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # the standard library encoder is used instead
+    orjson = None
+
+JSON_BACKEND = os.getenv('COMPLAINT_JSON', 'orjson' if orjson else 'stdlib').lower()
+if JSON_BACKEND not in ('orjson', 'stdlib'):
+    raise ValueError("COMPLAINT_JSON must be 'orjson' or 'stdlib'")
+if JSON_BACKEND == 'orjson' and orjson is None:
+    raise ImportError("COMPLAINT_JSON=orjson but orjson is not installed")
+
+# orjson otherwise rejects int dict keys and numpy scalars that json.dumps accepts,
+# and writes dates as ISO 8601 itself instead of passing them to ``default``
+_ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+) if orjson else 0
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+# Raised by loads(); orjson's error subclasses it
+JSONDecodeError = json.JSONDecodeError
+
+
+def _stdlib_encoder(default: Optional[Callable[[Any], Any]], sort_keys: bool) -> json.JSONEncoder:
+    if default is None and not sort_keys:
+        return _encoder
+    return json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=default,
+                            sort_keys=sort_keys)
+
+
+def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None,
+          sort_keys: bool = False) -> bytes:
+    """Encode ``obj`` as compact UTF-8 JSON.
+
+    ``default`` converts objects JSON has no type for (dates included), and
+    ``sort_keys`` orders object keys, both as in ``json.dumps``.
+    """
+    if JSON_BACKEND == 'orjson':
+        option = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _ORJSON_OPTIONS
+        return orjson.dumps(obj, default=default, option=option)
+    return _stdlib_encoder(default, sort_keys).encode(obj).encode('utf-8')
+
+
+def dumps_str(obj: Any, default: Optional[Callable[[Any], Any]] = None,
+              sort_keys: bool = False) -> str:
+    """Like :func:`dumps`, returning text."""
+    if JSON_BACKEND == 'orjson':
+        return dumps(obj, default, sort_keys).decode('utf-8')
+    return _stdlib_encoder(default, sort_keys).encode(obj)
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Decode one JSON document; raises JSONDecodeError."""
+    if JSON_BACKEND == 'orjson':
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_file(path: Union[str, os.PathLike]) -> Any:
+    """Read and decode a whole JSON file."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes ``jsonify`` responses with :func:`dumps`.
+
+    Flask's own conversions (HTTP dates, UUIDs, dataclasses, ...) and its
+    ``sort_keys`` setting still apply, and pretty-printed debug responses keep
+    the default provider.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps_str(obj, self.default, self.sort_keys)
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, self.default, self.sort_keys) + b'\n', mimetype=self.mimetype)
+
+
+def _benchmark(count: int = 5000, rounds: int = 5) -> None:
+    """Compare encoders and layouts on synthetic complaints."""
+    complaints = [
+        {
+            'id': f"CMP-{i:04d}", 'title': f"Complaint {i}", 'domain': 'education',
+            'description': "The projector in room 204 has not worked for two weeks — "
+                           "lectures are being cancelled. " * 3,
+            'status': 'pending', 'priority': 'High', 'department': 'IT',
+            'createdAt': '2025-01-15T10:30:00',
+            'analysis': {'category': 'Infrastructure', 'priority': 'High', 'type': 'Facility',
+                         'assignedDepartment': 'IT', 'aiConfidence': 87.5},
+        }
+        for i in range(count)
+    ]
+
+    def best(fn):
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    cases = [
+        ('json indent=2', lambda: json.dumps(complaints, indent=2).encode('utf-8'), json.loads),
+        ('json compact', lambda: _encoder.encode(complaints).encode('utf-8'), json.loads),
+    ]
+    if orjson is not None:
+        cases.append(('orjson', lambda: orjson.dumps(complaints, option=_ORJSON_OPTIONS),
+                      orjson.loads))
+    else:
+        print("orjson is not installed; install it to compare the accelerated encoder")
+
+    print(f"{count} complaints, best of {rounds} rounds")
+    print(f"{'encoder':<16}{'bytes':>12}{'encode ms':>12}{'decode ms':>12}")
+    for name, encode, decode in cases:
+        encode_time, body = best(encode)
+        decode_time, _ = best(lambda: decode(body))
+        print(f"{name:<16}{len(body):>12}{encode_time * 1000:>12.1f}{decode_time * 1000:>12.1f}")
+
+
+if __name__ == '__main__':
+    _benchmark(*(int(arg) for arg in sys.argv[1:3]))
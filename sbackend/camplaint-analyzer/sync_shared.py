@@ -0,0 +1,76 @@
+"""Copy the modules the analyzer shares with the backend.
+
+backend/ holds the one implementation of these; the analyzer is deployed on
+its own (the Docker build context is sbackend/), so it carries copies under
+the same package paths and imports them the same way (storage.locking,
+services.scorer, ...). Never edit a copy: change the backend module and run
+
+    python sync_shared.py            # refresh the copies
+    python sync_shared.py --check    # exit 1 if any copy differs from backend/
+
+test_shared.py runs the check, so a copy that drifted fails the tests.
+"""
+import argparse
+import os
+import shutil
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(HERE, '..', '..', 'backend')
+
+SHARED_FILES = [
+    'storage/__init__.py',
+    'storage/serialization.py',
+    'storage/locking.py',
+    'storage/id_index.py',
+    'utils/__init__.py',
+    'utils/compression.py',
+    'services/__init__.py',
+    'services/analysis_cache.py',
+    'services/classifier.py',
+    'services/scorer.py',
+]
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def drifted(backend_dir=BACKEND_DIR):
+    """Return the shared files whose analyzer copy differs from backend/."""
+    return [name for name in SHARED_FILES
+            if _read(os.path.join(HERE, name)) != _read(os.path.join(backend_dir, name))]
+
+
+def sync(backend_dir=BACKEND_DIR):
+    """Copy every changed shared file from backend/; returns their names."""
+    changed = drifted(backend_dir)
+    for name in changed:
+        target = os.path.join(HERE, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(os.path.join(backend_dir, name), target)
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--check', action='store_true',
+                        help='only report copies that differ from backend/')
+    args = parser.parse_args()
+    if not os.path.isdir(BACKEND_DIR):
+        sys.exit(f"{BACKEND_DIR} not found; run this from a full checkout")
+    if args.check:
+        changed = drifted()
+        for name in changed:
+            print(f"out of date: {name}")
+        sys.exit(1 if changed else 0)
+    for name in sync():
+        print(f"copied {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Parity check: the numpy scorer must classify exactly like the sklearn model.
+
+Run directly (or under pytest), this trains a small fused model on the
+training CSVs into a temporary directory, exports it, and runs
+check_parity() from services/classifier.py (which train.py also runs after
+every export) on services/scorer.py; both are the backend's modules, kept in
+sync by test_shared.py. No committed model files are needed:
+
+    python test_scorer.py
+"""
+import csv
+import os
+import sys
+import tempfile
+
+from services.classifier import EDGE_CASES, FUSED_MODEL_FILE, check_parity
+from services.scorer import SCORER_DIR, export_scorer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COMPLAINT_FILES = ['complaints.csv', 'healthcare_complaints.csv', 'business_complaints.csv']
+HEAD_ALPHAS = {'category': 0.1, 'priority': 0.5, 'type': 0.5, 'department': 0.1}
+
+def load_texts():
+    texts, labels = [], {head: [] for head in HEAD_ALPHAS}
+    for name in COMPLAINT_FILES:
+        path = os.path.join(HERE, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if all(row.get(column) for column in ('complaint_text', *HEAD_ALPHAS)):
+                    texts.append(row['complaint_text'])
+                    for head in HEAD_ALPHAS:
+                        labels[head].append(row[head])
+    return texts, labels
+
+
+def train_small_model(models_dir, texts, labels):
+    """Fit a fused model like train.py's (on every row) and export its scorer."""
+    import joblib
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.naive_bayes import MultinomialNB
+
+    vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))
+    features = vectorizer.fit_transform(texts)
+    heads = {head: MultinomialNB(alpha=alpha).fit(features, labels[head])
+             for head, alpha in HEAD_ALPHAS.items()}
+    joblib.dump({'vectorizer': vectorizer, 'heads': heads}, os.path.join(models_dir, FUSED_MODEL_FILE))
+    export_scorer(vectorizer, heads, os.path.join(models_dir, SCORER_DIR))
+
+
+def test_scorers_match_sklearn():
+    texts, labels = load_texts()
+    assert texts, "no training CSVs found"
+    with tempfile.TemporaryDirectory() as models_dir:
+        train_small_model(models_dir, texts, labels)
+        mismatches = check_parity(models_dir, texts + EDGE_CASES)
+    for text, expected, actual in mismatches[:10]:
+        print(f"MISMATCH {text[:60]!r}\n  sklearn: {expected}\n  scorer:  {actual}")
+    assert not mismatches, f"{len(mismatches)} analyses differ from sklearn"
+
+
+if __name__ == '__main__':
+    try:
+        test_scorers_match_sklearn()
+    except AssertionError as e:
+        print(e)
+        sys.exit(1)
+    print("Parity OK: the scorer matches sklearn on every training complaint and edge case")
@@ -0,0 +1,27 @@
+"""Drift check: the analyzer's shared modules must be exact copies of backend/.
+
+Runs under pytest or directly:
+
+    python test_shared.py
+"""
+import os
+import sys
+
+from sync_shared import BACKEND_DIR, drifted
+
+
+def test_shared_modules_match_backend():
+    if not os.path.isdir(BACKEND_DIR):
+        # A standalone analyzer checkout has nothing to compare against
+        return
+    changed = drifted()
+    assert not changed, f"run sync_shared.py; out of date: {', '.join(changed)}"
+
+
+if __name__ == '__main__':
+    try:
+        test_shared_modules_match_backend()
+    except AssertionError as e:
+        print(e)
+        sys.exit(1)
+    print("Shared modules match backend/")
@@ -7,6 +7,9 @@ from sklearn.metrics import accuracy_score, classification_report
 import joblib
 import os
 
+from services.classifier import EDGE_CASES, check_parity
+from services.scorer import SCORER_DIR, export_scorer
+
 print("Training script started...")
 
 # --- Step 1: Load Data ---
@@ -111,4 +114,35 @@ joblib.dump(type_model, os.path.join(MODELS_DIR, 'type_model.pkl'))
 joblib.dump(department_model, os.path.join(MODELS_DIR, 'department_model.pkl')) # Naya model save karein
 
 print(f"\nAll 4 models saved successfully in '{MODELS_DIR}' folder.")
+
+
+# --- Step 7: Train and Save the Fused Model ---
+# One vectorizer shared by the four heads, so the API vectorizes each
+# complaint once instead of four times (see services/classifier.py).
+print("\n--- Training Fused Model ---")
+head_alphas = {'category': 0.1, 'priority': 0.5, 'type': 0.5, 'department': 0.1}
+# Same split as the per-head models above
+X_train, X_test, y_train, y_test = train_test_split(X, df[list(head_alphas)], test_size=0.2, random_state=42)
+vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1,2))
+X_train_vec = vectorizer.fit_transform(X_train)
+X_test_vec = vectorizer.transform(X_test)
+heads = {}
+for head, alpha in head_alphas.items():
+    heads[head] = MultinomialNB(alpha=alpha).fit(X_train_vec, y_train[head])
+    print(f"Fused {head} head accuracy: {accuracy_score(y_test[head], heads[head].predict(X_test_vec)):.2f}")
+
+joblib.dump({'vectorizer': vectorizer, 'heads': heads}, os.path.join(MODELS_DIR, 'fused_model.pkl'))
+print(f"Fused model saved to '{os.path.join(MODELS_DIR, 'fused_model.pkl')}'.")
+
+
+# --- Step 8: Export the Numpy Scorer ---
+# The fused model as plain arrays that the API memory-maps and scores with
+# numpy alone (see services/scorer.py); checked against the fused model before use.
+print("\n--- Exporting Numpy Scorer ---")
+scorer_dir = os.path.join(MODELS_DIR, SCORER_DIR)
+manifest = export_scorer(vectorizer, heads, scorer_dir)
+mismatches = check_parity(MODELS_DIR, X.tolist() + EDGE_CASES)
+if mismatches:
+    raise RuntimeError(f"Scorer disagrees with the fused model on {len(mismatches)} texts, e.g. {mismatches[0]}")
+print(f"Scorer {manifest['version']} saved to '{scorer_dir}' and matches the fused model.")
 print("Training script finished.")
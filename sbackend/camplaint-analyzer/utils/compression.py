@@ -0,0 +1,129 @@
+"""gzip response compression negotiated through ``Accept-Encoding``.
+
+:func:`init_compression` installs an ``after_request`` hook that compresses
+text responses (JSON, NDJSON, CSV, ...) of at least ``COMPRESS_MIN_SIZE`` bytes.
+Streamed responses are compressed chunk by chunk and flushed after every
+chunk, so a streamed listing still reaches the client incrementally.
+
+Responses that carry an ETag keep their compressed body in a small LRU cache
+keyed by that tag, so repeated fetches of an unchanged listing are not
+recompressed. This relies on the ETag identifying the exact body for the
+negotiated encoding, which is why :func:`negotiated_encoding` is part of the
+tag computed in ``app.py``.
+"""
+
+import gzip
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional, Union
+
+from flask import Flask, Response, request
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+# Total size of cached compressed bodies; 0 disables the cache
+COMPRESS_CACHE_BYTES = int(os.getenv('COMPRESS_CACHE_BYTES', str(8 * 1024 * 1024)))
+
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/plain',
+    'text/css', 'application/javascript',
+)
+
+
+def negotiated_encoding() -> Optional[str]:
+    """'gzip' if the current request accepts it, else None (identity)."""
+    return 'gzip' if request.accept_encodings.quality('gzip') > 0 else None
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (ETag, encoding), bounded by total size."""
+
+    def __init__(self, max_bytes: int = COMPRESS_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._bodies: 'OrderedDict[tuple, bytes]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+            return body
+
+    def put(self, key: tuple, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._bodies.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._bodies[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._bodies.popitem(last=False)
+                self._size -= len(evicted)
+
+
+def _gzip_stream(chunks: Iterable[Union[bytes, str]], level: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(response: Response, level: int = COMPRESS_LEVEL,
+                      min_size: int = COMPRESS_MIN_SIZE,
+                      cache: Optional[CompressedBodyCache] = None) -> Response:
+    """gzip ``response`` in place if the request accepts it and it is worth it."""
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    # The body depends on Accept-Encoding whether or not this one is compressed.
+    response.vary.add('Accept-Encoding')
+    encoding = negotiated_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _gzip_stream(response.response, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        etag, weak = response.get_etag()
+        cacheable = cache is not None and etag and not weak
+        compressed = cache.get((etag, encoding)) if cacheable else None
+        if compressed is None:
+            compressed = gzip.compress(body, level, mtime=0)
+            if cacheable:
+                cache.put((etag, encoding), compressed)
+        response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app: Flask, level: int = COMPRESS_LEVEL,
+                     min_size: int = COMPRESS_MIN_SIZE,
+                     cache_bytes: int = COMPRESS_CACHE_BYTES) -> Optional[CompressedBodyCache]:
+    """Compress ``app``'s responses; returns the compressed body cache, if any."""
+    cache = CompressedBodyCache(cache_bytes) if cache_bytes > 0 else None
+
+    @app.after_request
+    def _compress(response: Response) -> Response:
+        return compress_response(response, level, min_size, cache)
+
+    return cache